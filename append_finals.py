@@ -1,20 +1,27 @@
-import os, re, time, urllib.parse
-from datetime import date, datetime, timedelta
+import os, re, sys
+from datetime import date, datetime
 from typing import List, Dict, Optional
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup
-from ics import Calendar
+from crawler import HostThrottle, crawl_schools
+from http_cache import CachedFetcher
+from event_store import EventStore
+from finals_extract import FinalsExtractor, guess_term
+from frontier import Frontier, load_seeds
+from incremental import incremental_update, extraction_params
+from profiling import PROFILER, timed, finish
+from storage import load_table, save_table, write_columnar, columnar_path
 
 HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; FinalsICS-Appender/1.0)"}
 TIMEOUT = 25
-DELAY   = 1.5
+DELAY   = 1.5     # per-host politeness delay (seconds)
+WORKERS = 8       # schools crawled concurrently
 MIN_YEAR = 2019
 MAX_YEAR = date.today().year
 
 DATA_RAW  = os.path.join(".", "data_raw")
-os.makedirs(DATA_RAW, exist_ok=True)
 FINALS_CSV = os.path.join(DATA_RAW, "finals_boston_universities.csv")
+MANIFEST   = os.path.join(DATA_RAW, "finals_manifest.json")   # per-feed hashes for --incremental
+COLUMNAR   = None   # "parquet" / "arrow" to also write a typed columnar copy (--columnar=...)
 
 # >>> New set of Boston-area schools to try <<<
 SCHOOLS = [
@@ -33,119 +40,30 @@ SCHOOLS = [
 ]
 
 FINAL_KEYS = re.compile(r"\b(final|finals|exam|examination)\b", re.I)
+LOOKS_CALENDAR = re.compile(r"(calendar|academic|schedule|dates|exam|final|registrar)", re.I)   # subpages worth following
 
-def get_html(url: str) -> Optional[str]:
-    try:
-        r = requests.get(url, headers=HEADERS, timeout=TIMEOUT)
-        if r.status_code != 200:
-            print(f"  ! HTTP {r.status_code} for {url}")
-            return None
-        return r.text
-    except Exception as e:
-        print(f"  ! Error fetching {url}: {e}")
-        return None
-
-def same_domain(base_url: str, link: str) -> bool:
-    try:
-        bu = urllib.parse.urlparse(base_url)
-        lu = urllib.parse.urlparse(link)
-        return (lu.netloc == "" or lu.netloc == bu.netloc)
-    except Exception:
-        return False
+THROTTLE = HostThrottle(DELAY)
+# shared pooled session + conditional-GET cache for pages and .ics feeds
+FETCHER  = CachedFetcher(os.path.join(".", ".http_cache"), headers=HEADERS, timeout=TIMEOUT,
+                         pool_size=WORKERS, throttle=THROTTLE)
+# link discovery: normalized-URL dedup, robots.txt (+ Crawl-delay), per-host budgets
+FRONTIER = Frontier(FETCHER, "FinalsICS-Appender", THROTTLE, looks_calendar=LOOKS_CALENDAR)
 
+@timed("discover_ics_links")
 def discover_ics_links(start_url: str, max_links: int = 10) -> List[str]:
-    """Find .ics links on the page and a few same-domain 'calendar-like' subpages."""
-    html = get_html(start_url)
-    if not html:
-        return []
-    soup = BeautifulSoup(html, "lxml")
-
-    links = []
-    for a in soup.find_all("a", href=True):
-        href = a["href"].strip()
-        full = urllib.parse.urljoin(start_url, href)
-        links.append(full)
-
-
-    ics_links = [u for u in links if u.lower().endswith(".ics") and same_domain(start_url, u)]
-    if ics_links:
-        return list(dict.fromkeys(ics_links))[:max_links]
-
-    looks_calendar = re.compile(r"(calendar|academic|schedule|dates|exam|final|registrar)", re.I)
-    subpages = [u for u in links if same_domain(start_url, u) and looks_calendar.search(u)]
-    subpages = list(dict.fromkeys(subpages))[:max_links]
-
-    found = []
-    for sp in subpages:
-        time.sleep(DELAY)
-        html2 = get_html(sp)
-        if not html2:
-            continue
-        soup2 = BeautifulSoup(html2, "lxml")
-        for a in soup2.find_all("a", href=True):
-            href2 = a["href"].strip()
-            full2 = urllib.parse.urljoin(sp, href2)
-            if full2.lower().endswith(".ics") and same_domain(start_url, full2):
-                found.append(full2)
-
-    return list(dict.fromkeys(found))[:max_links]
-
-def parse_ics(url: str) -> List[Dict]:
-    """Return flat list of events: title, description, start, end, source_url"""
-    try:
-        r = requests.get(url, headers=HEADERS, timeout=TIMEOUT)
-        if r.status_code != 200:
-            print(f"    ! HTTP {r.status_code} for ICS {url}")
-            return []
-        cal = Calendar(r.text)
-        out = []
-        for ev in cal.events:
-            if not ev.begin or not ev.end:
-                continue
-            start = ev.begin.date()
-            end_exclusive = ev.end.date()
-            # normalize to inclusive end
-            end = end_exclusive - timedelta(days=1)
-            out.append({
-                "title": (ev.name or "").strip(),
-                "description": (ev.description or "").strip(),
-                "start": start,
-                "end": end,
-                "source_url": url
-            })
-        return out
-    except Exception as e:
-        print(f"    ! Error parsing ICS {url}: {e}")
-        return []
-
-def guess_term(month: int) -> str:
-    if month in (4,5,6):  return "Spring"
-    if month in (11,12):  return "Fall"
-    return "Unknown"
-
-def finals_from_events(events: List[Dict]) -> List[Dict]:
-    rows = []
-    for ev in events:
-        s, e = ev["start"], ev["end"]
-        if not (MIN_YEAR <= s.year <= MAX_YEAR or MIN_YEAR <= e.year <= MAX_YEAR):
-            continue
-        text = f"{ev['title']} {ev['description']}"
-        if not FINAL_KEYS.search(text):
-            continue
-        if e < s:
-            s, e = e, s
-        rows.append({"start": s, "end": e, "source_url": ev["source_url"]})
-    # dedupe
-    dedup = {(r["start"], r["end"], r["source_url"]) for r in rows}
-    return [{"start": s, "end": e, "source_url": u} for (s,e,u) in sorted(dedup)]
+    """Find same-domain .ics links on the start page, or on calendar-looking pages a few hops away."""
+    return FRONTIER.discover(start_url, max_links)
+
+# .ics -> finals windows, shared with scrape_finals.py (see finals_extract)
+EXTRACTOR = FinalsExtractor(FETCHER, FINAL_KEYS, MIN_YEAR, MAX_YEAR, discover_ics_links)
 
 def load_existing() -> pd.DataFrame:
     if os.path.exists(FINALS_CSV):
-        df = pd.read_csv(FINALS_CSV)
-        # normalize dtypes if present
-        for c in ["finals_start","finals_end"]:
-            if c in df.columns:
-                df[c] = pd.to_datetime(df[c]).dt.date
+        # reads an up-to-date columnar copy when there is one (no date parsing), else the CSV
+        df = load_table(FINALS_CSV, "finals")
+        for c in ["school","term","source_url"]:
+            if c in df.columns and isinstance(df[c].dtype, pd.CategoricalDtype):
+                df[c] = df[c].astype(object)
         return df
     else:
         return pd.DataFrame(columns=["school","term","year","finals_start","finals_end","source_url"])
@@ -158,53 +76,37 @@ def backup_existing():
         pd.read_csv(FINALS_CSV).to_csv(backup, index=False)
         print(f"Backed up existing CSV → {backup}")
 
-def main():
+def main(incremental: bool = False, columnar: Optional[str] = COLUMNAR, schools: List[Dict] = SCHOOLS):
+    os.makedirs(DATA_RAW, exist_ok=True)
+    if incremental:
+        # the manifest keeps every feed's previous rows, so no backup copy is needed
+        print("Refreshing additional schools incrementally from the scrape manifest…\n")
+        df = incremental_update(schools, FINALS_CSV, MANIFEST, discover_ics_links, FETCHER,
+                                EXTRACTOR.finals_from_response, guess_term,
+                                lambda items, fn: crawl_schools(items, fn, WORKERS),
+                                extraction_params(MIN_YEAR, MAX_YEAR, FINAL_KEYS))
+        if columnar:
+            write_columnar(df, columnar_path(FINALS_CSV, columnar), "finals")
+        return
+
     print("Loading existing finals CSV (if any)…")
     existing = load_existing()
 
     backup_existing()
 
-    new_rows = []
-    print("\nDiscovering .ics feeds for additional Boston-area schools…")
-    for item in SCHOOLS:
-        school = item["school"]
-        start  = item["start"]
-        print(f"\n{school} → {start}")
-        time.sleep(DELAY)
-        ics_links = discover_ics_links(start)
-        if not ics_links:
-            print("  (no ICS links found)")
-            continue
-        for ics in ics_links:
-            print(f"  ICS: {ics}")
-            time.sleep(DELAY)
-            events = parse_ics(ics)
-            finals = finals_from_events(events)
-            if not finals:
-                print("    (no finals-like events in this ICS)")
-                continue
-            for w in finals:
-                term = guess_term(w["start"].month)
-                new_rows.append({
-                    "school": school,
-                    "term": term,
-                    "year": w["start"].year,
-                    "finals_start": w["start"],
-                    "finals_end": w["end"],
-                    "source_url": w["source_url"]
-                })
-
-    add_df = pd.DataFrame(new_rows)
+    print("\nDiscovering .ics feeds for additional Boston-area schools…\n")
+    store = EventStore.concat(crawl_schools(schools, EXTRACTOR.crawl_school, WORKERS))
+    add_df = store.unique(("school", "start", "end")).to_frame(guess_term)
     if add_df.empty:
         print("\nNo new finals rows discovered from these schools.")
 
         if not existing.empty:
-            existing.to_csv(FINALS_CSV, index=False)
+            save_table(existing, FINALS_CSV, "finals", columnar)
             print(f"Re-saved existing CSV → {FINALS_CSV} (rows={len(existing)})")
         else:
 
             empty = pd.DataFrame(columns=["school","term","year","finals_start","finals_end","source_url"])
-            empty.to_csv(FINALS_CSV, index=False)
+            save_table(empty, FINALS_CSV, "finals", columnar)
             print(f"Created empty finals CSV with headers → {FINALS_CSV}")
         return
 
@@ -220,7 +122,7 @@ def main():
     )
 
     # Save
-    combined.to_csv(FINALS_CSV, index=False)
+    save_table(combined, FINALS_CSV, "finals", columnar)
     print(f"\n✅ Appended finals CSV → {FINALS_CSV} (rows={len(combined)})")
     # Show what was added
     new_only = pd.merge(add_df, existing, on=["school","finals_start","finals_end"], how="left", indicator=True)
@@ -232,4 +134,14 @@ def main():
         print("\n(Note: all discovered rows were already present.)")
 
 if __name__ == "__main__":
-    main()
+    fmt = next((a.split("=", 1)[1] for a in sys.argv if a.startswith("--columnar=")), COLUMNAR)
+    seeds = next((a.split("=", 1)[1] for a in sys.argv if a.startswith("--seeds=")), None)
+    profile = "--profile" in sys.argv
+    if profile:
+        PROFILER.enable()
+    try:
+        main(incremental="--incremental" in sys.argv, columnar=fmt,
+             schools=load_seeds(seeds) if seeds else SCHOOLS)
+    finally:
+        if profile:
+            finish()
@@ -0,0 +1,282 @@
+import os, sys, json, time, random, argparse, platform, subprocess, tracemalloc
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from http_cache import CachedResponse
+from profiling import peak_rss_mb
+
+# Offline benchmarks for the pipeline's hot functions on synthetic data: no registrar
+# sites, no Google. Each case is timed at increasing scale (best of --repeat runs) and
+# then run once more under tracemalloc for peak allocated memory. Results are written
+# to .bench/<commit>-<timestamp>.json so runs on different commits can be compared:
+#   python bench.py                      # scales 1,4,16
+#   python bench.py --scales 1,4,16,64 --only parse_ics,add_features
+#   python bench.py --compare last       # vs the previous stored run (or a commit prefix / file)
+
+# ------------------- SETTINGS -------------------
+BENCH_DIR  = ".bench"
+SCALES     = [1, 4, 16]
+REPEAT     = 3
+MAX_REPEAT_SECONDS = 10   # stop repeating a slow case once this much time is spent on it
+TOLERANCE  = 0.25     # slower by more than this fraction -> flagged as a regression
+SEED       = 7
+
+# scale 1 workload
+SCHOOLS_PER_SCALE = 10        # finals: schools x years
+YEARS             = 5
+ICS_EVENTS        = 500       # events per feed
+FINALS_SHARE      = 0.1       # share of events that look like finals
+TREND_DAYS        = 5 * 365   # daily Trends rows
+KEYWORDS          = ["pizza near me", "coffee near me"]
+
+# ------------------- GENERATORS -------------------
+def synth_finals(n_schools: int, years: int = YEARS, seed: int = SEED) -> pd.DataFrame:
+    """Finals CSV rows: a Fall and Spring window per school-year plus scattered one-day exams."""
+    rng = random.Random(seed)
+    last = date.today().year
+    rows = []
+    for i in range(n_schools):
+        school, url = f"School {i:05d}", f"https://registrar.school{i}.edu/calendar.ics"
+        for year in range(last - years + 1, last + 1):
+            for term, month, day in (("Spring", 5, 1), ("Fall", 12, 8)):
+                s = date(year, month, day) + timedelta(days=rng.randint(0, 14))
+                e = s + timedelta(days=rng.randint(3, 9))
+                rows.append((school, term, year, s, e, url))
+            for _ in range(2):
+                s = date(year, 1, 1) + timedelta(days=rng.randint(0, 364))
+                rows.append((school, "Unknown", year, s, s, url))
+    return pd.DataFrame(rows, columns=["school", "term", "year", "finals_start", "finals_end", "source_url"])
+
+def synth_ics(n_events: int, finals_share: float = FINALS_SHARE, seed: int = SEED) -> str:
+    """A VCALENDAR with all-day and timed events, folded long descriptions and VALARMs."""
+    rng = random.Random(seed)
+    last = date.today().year
+    out = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//bench//synthetic//EN"]
+    for i in range(n_events):
+        s = date(rng.randint(last - 8, last), 1, 1) + timedelta(days=rng.randint(0, 364))
+        finals = rng.random() < finals_share
+        title = rng.choice(["Final Examinations", "Final exam period", "Reading and exam days"]) if finals \
+            else rng.choice(["Add/drop deadline", "Holiday - no classes", "Registration opens", "Seminar"])
+        desc = "Details: " + " ".join(rng.choice(["room", "hall", "see", "portal", "office"]) for _ in range(20))
+        out += ["BEGIN:VEVENT", f"UID:{i}@bench"]
+        if rng.random() < 0.7:
+            out += [f"DTSTART;VALUE=DATE:{s:%Y%m%d}",
+                    f"DTEND;VALUE=DATE:{s + timedelta(days=rng.randint(1, 8)):%Y%m%d}"]
+        else:
+            out += [f"DTSTART:{s:%Y%m%d}T090000Z", f"DURATION:PT{rng.randint(1, 5)}H"]
+        out += [f"SUMMARY:{title}", "DESCRIPTION:" + desc[:60]]
+        out += [" " + desc[j:j + 60] for j in range(60, len(desc), 60)]   # folded lines
+        if rng.random() < 0.1:
+            out += ["BEGIN:VALARM", "ACTION:DISPLAY", "DESCRIPTION:Reminder", "TRIGGER:-PT15M",
+                    "END:VALARM"]
+        out.append("END:VEVENT")
+    out.append("END:VCALENDAR")
+    return "\r\n".join(out) + "\r\n"
+
+def synth_trends(n_periods: int, freq: str = "D", keywords: List[str] = KEYWORDS,
+                 seed: int = SEED) -> pd.DataFrame:
+    """Trends-shaped frame (date + one 0-100 column per keyword) ending today."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(end=pd.Timestamp.today().normalize(), periods=n_periods, freq=freq)
+    t = np.arange(n_periods)
+    df = pd.DataFrame({"date": dates})
+    for k in keywords:
+        season = 10 * np.sin(2 * np.pi * t / (365 if freq == "D" else 52))
+        df[k.replace(" ", "_")] = np.clip(50 + season + rng.normal(0, 5, n_periods), 0, 100).round()
+    return df
+
+class StaticFetcher:
+    """Serves pre-built bodies from memory in place of the extractor's fetcher, so parse_ics does no I/O."""
+    def __init__(self, bodies: Dict[str, bytes]):
+        self.bodies = bodies
+
+    def get(self, url: str, stream: bool = False) -> CachedResponse:
+        return CachedResponse(200, self.bodies[url], "utf-8")
+
+@contextmanager
+def serving(sf, bodies: Dict[str, bytes]):
+    old = sf.EXTRACTOR.fetcher
+    sf.EXTRACTOR.fetcher = StaticFetcher(bodies)
+    try:
+        yield
+    finally:
+        sf.EXTRACTOR.fetcher = old
+
+# ------------------- CASES -------------------
+# name -> setup(scale) returning (callable, rows processed, bytes processed or None)
+def case_parse_ics(sf, scale):
+    url = "https://bench.invalid/cal.ics"
+    body = synth_ics(ICS_EVENTS * scale).encode("utf-8")
+    def run():
+        with serving(sf, {url: body}):
+            return sf.EXTRACTOR.parse_ics(url)
+    return run, ICS_EVENTS * scale, len(body)
+
+def case_finals_from_ics(sf, scale):
+    url = "https://bench.invalid/cal.ics"
+    body = synth_ics(ICS_EVENTS * scale).encode("utf-8")
+    def run():
+        with serving(sf, {url: body}):
+            return sf.EXTRACTOR.finals_from_ics(url)
+    return run, ICS_EVENTS * scale, len(body)
+
+def case_finals_from_events(sf, scale):
+    rng = random.Random(SEED)
+    last = date.today().year
+    events = []
+    for i in range(ICS_EVENTS * scale):
+        s = date(rng.randint(last - 8, last), 1, 1) + timedelta(days=rng.randint(0, 364))
+        finals = rng.random() < FINALS_SHARE
+        events.append({"title": "Final Examinations" if finals else "Seminar", "description": "",
+                       "start": s, "end": s + timedelta(days=rng.randint(0, 7)),
+                       "source_url": "https://bench.invalid/cal.ics"})
+    return (lambda: sf.EXTRACTOR.finals_from_events(events)), len(events), None
+
+def case_expand_finals_to_daily(sf, scale):
+    finals = synth_finals(SCHOOLS_PER_SCALE * scale)
+    return (lambda: sf.expand_finals_to_daily(finals)), len(finals), None
+
+def case_finals_weekly_intensity(sf, scale):
+    finals = synth_finals(SCHOOLS_PER_SCALE * scale)
+    return (lambda: sf.finals_weekly_intensity(finals)), len(finals), None
+
+def case_align_trends_to_week(sf, scale):
+    trends = synth_trends(TREND_DAYS * scale, "D")
+    return (lambda: sf.align_trends_to_week(trends)), len(trends), None
+
+def case_add_features(sf, scale):
+    weekly = sf.align_trends_to_week(synth_trends(TREND_DAYS * scale, "D"))
+    merged = sf.merge_weekly(weekly, sf.finals_weekly_intensity(synth_finals(SCHOOLS_PER_SCALE * scale)))
+    return (lambda: sf.add_features(merged)), len(merged), None
+
+CASES: Dict[str, Callable] = {
+    "parse_ics": case_parse_ics,
+    "finals_from_ics": case_finals_from_ics,
+    "finals_from_events": case_finals_from_events,
+    "expand_finals_to_daily": case_expand_finals_to_daily,
+    "finals_weekly_intensity": case_finals_weekly_intensity,
+    "align_trends_to_week": case_align_trends_to_week,
+    "add_features": case_add_features,
+}
+
+# ------------------- RUNNER -------------------
+def measure(fn: Callable, repeat: int = REPEAT) -> Dict:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+        if sum(times) > MAX_REPEAT_SECONDS:
+            break
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(times), "median_seconds": float(np.median(times)), "peak_alloc_mb": peak / 2 ** 20}
+
+def git_rev() -> Dict:
+    """Commit of the code being benchmarked (this file's checkout, not the working directory)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, timeout=10,
+                                  cwd=here).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"commit": git("rev-parse", "HEAD") or "unknown", "dirty": bool(git("status", "--porcelain", "--", "*.py"))}
+
+def run(scales: List[int] = SCALES, only: Optional[List[str]] = None, repeat: int = REPEAT) -> Dict:
+    import scrape_finals as sf
+    results = []
+    for name, setup in CASES.items():
+        if only and name not in only:
+            continue
+        for scale in scales:
+            fn, rows, nbytes = setup(sf, scale)
+            m = measure(fn, repeat)
+            r = {"case": name, "scale": scale, "rows": rows, **m,
+                 "rows_per_sec": rows / m["seconds"] if m["seconds"] else None}
+            if nbytes:
+                r["mb_per_sec"] = nbytes / 2 ** 20 / m["seconds"] if m["seconds"] else None
+            results.append(r)
+            print(f"{name:<26}x{scale:<4}{rows:>10} rows {m['seconds']:>9.4f}s "
+                  f"{r['rows_per_sec'] or 0:>12,.0f} rows/s {m['peak_alloc_mb']:>8.1f} MB")
+    return {"started": datetime.now().isoformat(timespec="seconds"), **git_rev(),
+            "python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+            "machine": platform.machine(), "peak_rss_mb": peak_rss_mb(), "repeat": repeat,
+            "results": results}
+
+def save(report: Dict, out_dir: str = BENCH_DIR) -> str:
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{report['commit'][:10]}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    return path
+
+def find_run(ref: str, out_dir: str = BENCH_DIR, exclude: Optional[str] = None) -> Optional[str]:
+    """Stored run for `ref`: a file path, "last" (newest), or a commit prefix (newest for it)."""
+    if os.path.isfile(ref):
+        return ref
+    if not os.path.isdir(out_dir):
+        return None
+    runs = sorted((os.path.join(out_dir, f) for f in os.listdir(out_dir) if f.endswith(".json")),
+                  key=os.path.getmtime, reverse=True)
+    runs = [p for p in runs if p != exclude]
+    if ref != "last":
+        runs = [p for p in runs if os.path.basename(p).startswith(ref[:10])]
+    return runs[0] if runs else None
+
+def compare(base: Dict, head: Dict, tolerance: float = TOLERANCE) -> List[Dict]:
+    """Per (case, scale) time ratio head/base; regressions are ratios above 1 + tolerance."""
+    old = {(r["case"], r["scale"]): r for r in base["results"]}
+    rows = []
+    for r in head["results"]:
+        b = old.get((r["case"], r["scale"]))
+        if b is None or not b["seconds"]:
+            continue
+        ratio = r["seconds"] / b["seconds"]
+        rows.append({"case": r["case"], "scale": r["scale"], "base_s": b["seconds"], "head_s": r["seconds"],
+                     "ratio": ratio, "mem_ratio": r["peak_alloc_mb"] / b["peak_alloc_mb"] if b["peak_alloc_mb"] else None,
+                     "regression": ratio > 1 + tolerance})
+    return rows
+
+def print_compare(rows: List[Dict], base: Dict, head: Dict):
+    print(f"\n{base['commit'][:10]} -> {head['commit'][:10]}{' (dirty)' if head.get('dirty') else ''}")
+    for r in rows:
+        mem = "" if r["mem_ratio"] is None else f"  mem x{r['mem_ratio']:.2f}"
+        flag = "  REGRESSION" if r["regression"] else ""
+        print(f"  {r['case']:<26}x{r['scale']:<4}{r['base_s']:>9.4f}s -> {r['head_s']:>9.4f}s  x{r['ratio']:.2f}{mem}{flag}")
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="bench.py", description="Synthetic-workload benchmarks")
+    p.add_argument("--scales", default=",".join(map(str, SCALES)), help="comma-separated, e.g. 1,4,16,64")
+    p.add_argument("--only", help="comma-separated case names: " + ", ".join(CASES))
+    p.add_argument("--repeat", type=int, default=REPEAT)
+    p.add_argument("--compare", help='stored run to compare with: "last", a commit prefix or a file')
+    p.add_argument("--tolerance", type=float, default=TOLERANCE)
+    p.add_argument("--no-save", action="store_true")
+    args = p.parse_args(argv)
+
+    report = run([int(s) for s in args.scales.split(",")],
+                 args.only.split(",") if args.only else None, args.repeat)
+    path = None if args.no_save else save(report)
+    if path:
+        print(f"\nBenchmark results → {path}")
+    if not args.compare:
+        return 0
+    base_path = find_run(args.compare, exclude=path)
+    if base_path is None:
+        print(f"No stored run matches '{args.compare}'")
+        return 0
+    with open(base_path, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    rows = compare(base, report, args.tolerance)
+    print_compare(rows, base, report)
+    return 1 if any(r["regression"] for r in rows) else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
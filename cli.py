@@ -0,0 +1,96 @@
+import argparse, sys
+
+# One entry point for the pipeline stages:
+#   python cli.py scrape    [--incremental] [--seeds=institutions.csv]   finals CSV from registrar .ics feeds
+#   python cli.py append    [--incremental] [--seeds=institutions.csv]   add more schools to the finals CSV
+#   python cli.py trends    [--geo=US-MA] [--keyword "pizza near me" ...] Google Trends snapshot
+#   python cli.py aggregate                                              finals weekly intensity + weekly merge
+#   python cli.py features  [--append] [--windows=4,8]                   moving averages -> tidy CSV
+#   python cli.py figures   [--force] [--only=name,...]                  redraw changed slide figures
+#   python cli.py serve     [--host=127.0.0.1] [--port=8765]             JSON query service over the outputs
+# Common flags: --columnar=parquet|arrow, --profile.
+# Nothing heavy is imported at module level; each stage imports what it needs, so
+# aggregate / features never load requests, ics or pytrends.
+
+def run_scrape(args):
+    import scrape_finals as sf
+    sf.build_finals_csv(args.incremental, args.columnar, _schools(args, sf.SCHOOLS))
+
+def run_append(args):
+    import append_finals as af
+    af.main(args.incremental, args.columnar, _schools(args, af.SCHOOLS))
+
+def run_trends(args):
+    import scrape_finals as sf
+    sf.build_trends_csv(args.columnar, args.keyword or sf.KEYWORDS, args.geo or sf.GEO)
+
+def run_aggregate(args):
+    import scrape_finals as sf
+    sf.build_weekly(columnar=args.columnar)
+
+def run_features(args):
+    import scrape_finals as sf
+    windows = [int(w) for w in args.windows.split(",")] if args.windows else None
+    sf.build_tidy(columnar=args.columnar, append=args.append, windows=windows)
+
+def run_figures(args):
+    import figures
+    figures.render_figures(only=args.only.split(",") if args.only else None, force=args.force)
+
+def run_serve(args):
+    import serve
+    serve.main([f"--host={args.host}", f"--port={args.port}"])
+
+def _schools(args, default):
+    if not args.seeds:
+        return default
+    from frontier import load_seeds
+    return load_seeds(args.seeds)
+
+def parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--columnar", choices=["parquet", "arrow"], default=None,
+                        help="also write typed columnar copies")
+    common.add_argument("--profile", action="store_true", help="print stage timings and write a JSON report")
+
+    p = argparse.ArgumentParser(prog="cli.py", description="Finals x Google Trends pipeline")
+    sub = p.add_subparsers(dest="stage", required=True)
+    for name, fn, help_ in [("scrape", run_scrape, "discover .ics feeds and build the finals CSV"),
+                            ("append", run_append, "append additional schools to the finals CSV")]:
+        sp = sub.add_parser(name, parents=[common], help=help_)
+        sp.add_argument("--incremental", action="store_true", help="only re-parse feeds whose content changed")
+        sp.add_argument("--seeds", help="CSV of school,start seed pages instead of the built-in list")
+        sp.set_defaults(fn=fn)
+    sp = sub.add_parser("trends", parents=[common], help="pull the Google Trends snapshot")
+    sp.add_argument("--geo")
+    sp.add_argument("--keyword", action="append", help="repeat for several keywords")
+    sp.set_defaults(fn=run_trends)
+    sub.add_parser("aggregate", parents=[common], help="weekly finals intensity merged with weekly Trends"
+                   ).set_defaults(fn=run_aggregate)
+    sp = sub.add_parser("features", parents=[common], help="moving averages and calendar columns -> tidy CSV")
+    sp.add_argument("--append", action="store_true", help="only recompute recent and new weeks")
+    sp.add_argument("--windows", help="moving-average lengths in weeks, e.g. 4,8,13 (default 4)")
+    sp.set_defaults(fn=run_features)
+    sp = sub.add_parser("figures", parents=[common], help="render the slide figures into slides/figs")
+    sp.add_argument("--only", help="comma-separated figure names")
+    sp.add_argument("--force", action="store_true", help="redraw even if inputs and style are unchanged")
+    sp.set_defaults(fn=run_figures)
+    sp = sub.add_parser("serve", parents=[common], help="answer intensity / schools / series queries over HTTP")
+    sp.add_argument("--host", default="127.0.0.1")
+    sp.add_argument("--port", type=int, default=8765)
+    sp.set_defaults(fn=run_serve)
+    return p
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    if not args.profile:
+        return args.fn(args)
+    from profiling import PROFILER, finish
+    PROFILER.enable()
+    try:
+        return args.fn(args)
+    finally:
+        finish()
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
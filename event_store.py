@@ -0,0 +1,183 @@
+import threading
+from array import array
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Pattern, Sequence
+import numpy as np
+import pandas as pd
+
+# Compact event store for ingest. One event is a 17-byte record in a NumPy structured
+# array: interned school and feed ids, start / inclusive end as days since 1970-01-01,
+# and whether its text matched the finals keywords. Titles and descriptions are not
+# kept. Keyword matching, the year window, start/end swaps, dedup and term guessing run
+# once per batch over whole columns instead of once per event dict.
+
+EPOCH = date(1970, 1, 1).toordinal()
+EVENT_DTYPE = np.dtype([("school", "<i4"), ("source", "<i4"),
+                        ("start", "<i4"), ("end", "<i4"), ("match", "?")])
+FINALS_COLUMNS = ["school","term","year","finals_start","finals_end","source_url"]
+
+# ------------------- INTERNING -------------------
+class Interner:
+    """str <-> dense int id. Shared by the crawl threads, so ids agree across stores."""
+    __slots__ = ("ids", "names", "_lock")
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+        self._lock = threading.Lock()
+
+    def id(self, name: str) -> int:
+        i = self.ids.get(name)
+        if i is None:
+            with self._lock:
+                i = self.ids.setdefault(name, len(self.names))
+                if i == len(self.names):
+                    self.names.append(name)
+        return i
+
+    def ids_of(self, names: Sequence[str]) -> np.ndarray:
+        codes, uniq = pd.factorize(pd.Series(names, dtype=object))
+        return np.array([self.id(u) for u in uniq], dtype="int32")[codes] if len(codes) else np.zeros(0, "int32")
+
+    def lookup(self, ids: np.ndarray) -> np.ndarray:
+        return np.asarray(self.names, dtype=object)[ids] if len(ids) else np.empty(0, dtype=object)
+
+SCHOOL_IDS = Interner()
+SOURCE_IDS = Interner()
+
+# ------------------- DAY ORDINALS -------------------
+def day_ordinal(d: date) -> int:
+    return d.toordinal() - EPOCH
+
+def years_of(days: np.ndarray) -> np.ndarray:
+    return days.astype("datetime64[D]").astype("datetime64[Y]").astype(np.int64) + 1970
+
+def months_of(days: np.ndarray) -> np.ndarray:
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) % 12 + 1
+
+def iso_dates(days: np.ndarray) -> np.ndarray:
+    return np.datetime_as_string(days.astype("datetime64[D]"), unit="D").astype(object)
+
+def match_texts(texts: List[str], keys: Pattern) -> np.ndarray:
+    """keys.search() over every text in one regex scan of the NUL-joined texts.
+    (The pattern must not match across a NUL, which holds for word patterns.)"""
+    if not texts:
+        return np.zeros(0, dtype=bool)
+    lens = np.fromiter(map(len, texts), np.int64, len(texts)) + 1
+    ends = np.cumsum(lens)
+    hits = np.fromiter((m.start() for m in keys.finditer("\0".join(texts))), np.int64)
+    out = np.zeros(len(texts), dtype=bool)
+    out[np.searchsorted(ends, hits, side="right")] = True
+    return out
+
+# ------------------- BUILDER -------------------
+class EventBuilder:
+    """Append-only typed columns for streaming ingest; no object per event."""
+    __slots__ = ("school", "source", "start", "end", "match")
+
+    def __init__(self):
+        self.school, self.source = array("i"), array("i")
+        self.start, self.end = array("i"), array("i")
+        self.match = array("b")
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def add(self, school: int, source: int, start: date, end: date, match: bool):
+        self.school.append(school)
+        self.source.append(source)
+        self.start.append(start.toordinal() - EPOCH)
+        self.end.append(end.toordinal() - EPOCH)
+        self.match.append(match)
+
+    def build(self) -> "EventStore":
+        rows = np.empty(len(self), EVENT_DTYPE)
+        for name in EVENT_DTYPE.names:
+            rows[name] = np.asarray(getattr(self, name))
+        return EventStore(rows)
+
+# ------------------- STORE -------------------
+class EventStore:
+    """Structured-array events with batch filters; school / source ids refer to the interners."""
+    __slots__ = ("rows",)
+
+    def __init__(self, rows: Optional[np.ndarray] = None):
+        self.rows = np.empty(0, EVENT_DTYPE) if rows is None else rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def from_events(cls, events: List[Dict], keys: Pattern, school: str = "") -> "EventStore":
+        """From parse_ics()-style dicts; the keyword search runs over all texts at once."""
+        rows = np.empty(len(events), EVENT_DTYPE)
+        if not events:
+            return cls(rows)
+        rows["school"] = SCHOOL_IDS.id(school)
+        rows["source"] = SOURCE_IDS.ids_of([ev["source_url"] for ev in events])
+        rows["start"] = np.fromiter((ev["start"].toordinal() for ev in events), "int32", len(events)) - EPOCH
+        rows["end"] = np.fromiter((ev["end"].toordinal() for ev in events), "int32", len(events)) - EPOCH
+        rows["match"] = match_texts([f"{ev['title']} {ev['description']}" for ev in events], keys)
+        return cls(rows)
+
+    @classmethod
+    def concat(cls, stores: Iterable["EventStore"]) -> "EventStore":
+        parts = [s.rows for s in stores if s is not None and len(s)]
+        return cls(np.concatenate(parts) if parts else None)
+
+    def finals(self, min_year: int, max_year: int) -> "EventStore":
+        """Keyword matches touching [min_year, max_year], start <= end, unique per
+        (start, end, source) and sorted like finals_from_events()."""
+        r = self.rows[self.rows["match"]]
+        ys, ye = years_of(r["start"]), years_of(r["end"])
+        r = r[((min_year <= ys) & (ys <= max_year)) | ((min_year <= ye) & (ye <= max_year))].copy()
+        lo, hi = np.minimum(r["start"], r["end"]), np.maximum(r["start"], r["end"])
+        r["start"], r["end"] = lo, hi
+        return EventStore(r).unique(("start", "end", "source"))
+
+    def unique(self, keys: Sequence[str]) -> "EventStore":
+        """First row of each distinct key, ordered by the keys (sources by URL, schools by name)."""
+        r = self.rows
+        if not len(r):
+            return EventStore(r)
+        cols = [self._sort_key(k) for k in keys]
+        order = np.lexsort(cols[::-1])            # stable: ties keep their original order
+        new = np.ones(len(order), dtype=bool)
+        new[1:] = np.any([c[order][1:] != c[order][:-1] for c in cols], axis=0)
+        return EventStore(r[order[new]])
+
+    def _sort_key(self, key: str) -> np.ndarray:
+        if key not in ("school", "source"):
+            return self.rows[key]
+        interner = SCHOOL_IDS if key == "school" else SOURCE_IDS
+        ids, inv = np.unique(self.rows[key], return_inverse=True)
+        rank = np.empty(len(ids), dtype=np.int64)
+        rank[np.argsort(interner.lookup(ids), kind="stable")] = np.arange(len(ids))
+        return rank[inv]
+
+    def terms(self, guess_term: Callable[[int], str]) -> np.ndarray:
+        """guess_term() of every start month, via a 12-entry lookup table."""
+        table = np.array([guess_term(m) for m in range(1, 13)], dtype=object)
+        return table[months_of(self.rows["start"]) - 1]
+
+    def to_rows(self) -> List[Dict]:
+        """[{"start": date, "end": date, "source_url": url}] as the finals_from_* functions return."""
+        r = self.rows
+        urls = SOURCE_IDS.lookup(r["source"])
+        starts = r["start"].astype("datetime64[D]").tolist()
+        ends = r["end"].astype("datetime64[D]").tolist()
+        return [{"start": s, "end": e, "source_url": u} for s, e, u in zip(starts, ends, urls)]
+
+    def to_frame(self, guess_term: Callable[[int], str]) -> pd.DataFrame:
+        """Finals CSV columns, built column-wise."""
+        r = self.rows
+        if not len(r):
+            return pd.DataFrame(columns=FINALS_COLUMNS)
+        return pd.DataFrame({
+            "school": SCHOOL_IDS.lookup(r["school"]),
+            "term": self.terms(guess_term),
+            "year": years_of(r["start"]),
+            "finals_start": iso_dates(r["start"]),
+            "finals_end": iso_dates(r["end"]),
+            "source_url": SOURCE_IDS.lookup(r["source"]),
+        })
@@ -0,0 +1,174 @@
+import os, warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Union
+import numpy as np
+import pandas as pd
+from finals_index import FinalsIndex
+from finals_weekly import day_ordinals, week_ordinals, week_start_from_ordinal
+
+# Event study of weekly search interest around finals. Every finals window is
+# aligned against the weekly table in one pass (searchsorted on week ordinals) into
+# an events x relative-weeks x keywords array; means, a cluster bootstrap over
+# events and a paired sign-flip permutation test then run as batched matrix
+# products, split into seeded batches that can go to a process pool.
+#
+#   res = event_study(weekly, FinalsIndex(finals), leads=3, lags=2)   # the notebook's k = -3..2
+
+# ------------------- SETTINGS -------------------
+LEADS        = 3          # weeks before the finals start week
+LAGS         = 2          # weeks after
+MONTHS       = (5, 12)    # start-week months kept (spring / fall finals), None = all
+N_BOOT       = 2000
+N_PERM       = 2000
+CI           = 0.95
+BATCH        = 500        # resamples per task
+PROCESSES    = os.cpu_count() or 1
+MIN_PARALLEL = 50_000_000 # events x cells x resamples below which a pool costs more than it saves
+SEED         = 0
+
+# ------------------- ALIGNMENT -------------------
+def event_weeks(finals: Union[FinalsIndex, pd.DataFrame], schools: Optional[List[str]] = None,
+                months: Optional[tuple] = MONTHS) -> np.ndarray:
+    """Week ordinals of the distinct finals windows' start weeks (optionally a school subset)."""
+    if not isinstance(finals, FinalsIndex):
+        finals = FinalsIndex(finals)
+    starts, _ = finals.distinct_windows(schools)
+    weeks = week_ordinals(starts)
+    if months is not None and len(weeks):
+        keep = np.isin(week_start_from_ordinal(weeks).month, months)
+        weeks = weeks[keep]
+    return np.sort(weeks)
+
+def align_events(weekly: pd.DataFrame, weeks: np.ndarray, rel_weeks: np.ndarray,
+                 value_cols: List[str]) -> np.ndarray:
+    """(events, rel_weeks, keywords) values from `weekly`; NaN where the week is missing."""
+    wk = week_ordinals(day_ordinals(weekly["week_start"]))
+    order = np.argsort(wk, kind="stable")
+    wk = wk[order]
+    vals = weekly[value_cols].to_numpy(dtype="float64")[order]
+    target = weeks[:, None] + rel_weeks[None, :]
+    idx = np.searchsorted(wk, target)
+    hit = idx < len(wk)
+    hit[hit] = wk[idx[hit]] == target[hit]
+    out = np.full(target.shape + (len(value_cols),), np.nan)
+    out[hit] = vals[idx[hit]]
+    return out
+
+# ------------------- RESAMPLING -------------------
+def _weighted_means(weights: np.ndarray, vals: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """weights (B, n) x values (n, R, K) -> (B, R, K) means over the present values."""
+    num = np.tensordot(weights, vals, axes=(1, 0))
+    den = np.tensordot(weights, mask, axes=(1, 0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(den > 0, num / den, np.nan)
+
+def resample_batch(kind: str, values: np.ndarray, base: int, size: int, seed) -> np.ndarray:
+    """One batch of resamples, run in a worker.
+
+    kind="boot": event-level bootstrap means, (size, R, K).
+    kind="perm": sign-flipped mean paired differences vs the baseline week, (size, R, K).
+    """
+    rng = np.random.default_rng(seed)
+    n = values.shape[0]
+    if kind == "boot":
+        mask = ~np.isnan(values)
+        draws = rng.integers(0, n, size=(size, n)) + np.arange(size)[:, None] * n
+        counts = np.bincount(draws.ravel(), minlength=size * n).reshape(size, n).astype("float64")
+        return _weighted_means(counts, np.where(mask, values, 0.0), mask.astype("float64"))
+    diff = values - values[:, base:base + 1, :]
+    mask = ~np.isnan(diff)
+    pairs = mask.sum(axis=0)
+    signs = rng.integers(0, 2, size=(size, n)).astype("float64") * 2 - 1
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.tensordot(signs, np.where(mask, diff, 0.0), axes=(1, 0)) / np.where(pairs > 0, pairs, np.nan)
+
+def _resample(kind: str, values: np.ndarray, base: int, n: int, seed: int,
+              processes: int) -> np.ndarray:
+    if n <= 0 or values.shape[0] == 0:
+        return np.empty((0,) + values.shape[1:])
+    sizes = [min(BATCH, n - i) for i in range(0, n, BATCH)]
+    seeds = np.random.SeedSequence([seed, 0 if kind == "boot" else 1]).spawn(len(sizes))
+    if processes <= 1 or len(sizes) == 1 or values.size * n < MIN_PARALLEL:
+        parts = [resample_batch(kind, values, base, s, sd) for s, sd in zip(sizes, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(processes, len(sizes))) as pool:
+            parts = list(pool.map(resample_batch, [kind] * len(sizes), [values] * len(sizes),
+                                  [base] * len(sizes), sizes, seeds))
+    return np.concatenate(parts)
+
+# ------------------- EVENT STUDY -------------------
+def event_study(weekly: pd.DataFrame, finals: Union[FinalsIndex, pd.DataFrame], keywords: Optional[List[str]] = None,
+                leads: int = LEADS, lags: int = LAGS, schools: Optional[List[str]] = None,
+                months: Optional[tuple] = MONTHS, baseline: Optional[int] = None,
+                n_boot: int = N_BOOT, n_perm: int = N_PERM, ci: float = CI,
+                processes: int = PROCESSES, seed: int = SEED) -> pd.DataFrame:
+    """Per keyword and relative week k in -leads..lags: mean, sem, bootstrap CI of the mean,
+    lift over the baseline week (default -leads) with its bootstrap CI, and a two-sided
+    sign-flip permutation p-value for the paired lift. `finals` is a FinalsIndex or the
+    finals table (indexed here)."""
+    if keywords is None:
+        keywords = [c for c in weekly.columns if c.endswith("_near_me")]
+    rel = np.arange(-leads, lags + 1)
+    base = int(np.flatnonzero(rel == (rel[0] if baseline is None else baseline))[0])
+    values = align_events(weekly, event_weeks(finals, schools, months), rel, keywords)
+
+    boot = _resample("boot", values, base, n_boot, seed, processes)
+    perm = _resample("perm", values, base, n_perm, seed, processes)
+
+    lo_q, hi_q = (1 - ci) / 2, 1 - (1 - ci) / 2
+    mask = ~np.isnan(values)
+    n = mask.sum(axis=0)
+    nan = np.full(n.shape, np.nan)
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)   # empty / single-event cells -> NaN
+        mean = np.nansum(values, axis=0) / n
+        sem = np.nanstd(values, axis=0, ddof=1) / np.sqrt(n)
+        lift = mean - mean[base]
+        diff = values - values[:, base:base + 1, :]
+        paired = np.nanmean(diff, axis=0) if len(diff) else nan
+        if len(boot):
+            boot_lift = boot - boot[:, base:base + 1, :]
+            ci_low, ci_high = np.nanquantile(boot, [lo_q, hi_q], axis=0)
+            lift_low, lift_high = np.nanquantile(boot_lift, [lo_q, hi_q], axis=0)
+        else:
+            ci_low = ci_high = lift_low = lift_high = nan
+        if len(perm):
+            extreme = (np.abs(perm) >= np.abs(paired)[None] - 1e-12).sum(axis=0)
+            p_value = np.where(np.isnan(paired), np.nan, (extreme + 1) / (len(perm) + 1))
+            p_value[base] = np.nan
+        else:
+            p_value = nan
+
+    out = []
+    for j, kw in enumerate(keywords):
+        out.append(pd.DataFrame({
+            "keyword": kw, "rel_week": rel, "n": n[:, j], "mean": mean[:, j], "sem": sem[:, j],
+            "ci_low": ci_low[:, j], "ci_high": ci_high[:, j],
+            "lift": lift[:, j], "lift_ci_low": lift_low[:, j], "lift_ci_high": lift_high[:, j],
+            "p_value": p_value[:, j],
+        }))
+    return pd.concat(out, ignore_index=True)
+
+def event_studies(weekly: pd.DataFrame, finals: Union[FinalsIndex, pd.DataFrame],
+                  school_sets: Dict[str, Optional[List[str]]], **kwargs) -> pd.DataFrame:
+    """event_study() for several named school subsets (None = every school), stacked;
+    the finals are indexed once and every subset is selected on the index."""
+    if not isinstance(finals, FinalsIndex):
+        finals = FinalsIndex(finals)
+    parts = []
+    for name, schools in school_sets.items():
+        res = event_study(weekly, finals, schools=schools, **kwargs)
+        res.insert(0, "school_set", name)
+        parts.append(res)
+    return pd.concat(parts, ignore_index=True)
+
+if __name__ == "__main__":
+    from scrape_finals import FINALS_CSV, TIDY_CSV, DATA_OUT
+    from storage import load_table
+    weekly = load_table(TIDY_CSV, "weekly")
+    index = FinalsIndex(load_table(FINALS_CSV, "finals"))
+    res = event_study(weekly, index)
+    out = os.path.join(DATA_OUT, "event_study.csv")
+    res.to_csv(out, index=False)
+    print(res.to_string(index=False))
+    print(f"\nSaved event study → {out}")
@@ -0,0 +1,182 @@
+import os, json
+from datetime import date
+from typing import Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+# Rolling-average features over the weekly table, with an append mode. The tidy CSV
+# is written together with <tidy>.state.json, which keeps the trailing rows' raw
+# values and their byte offsets in the CSV. A refresh then only recomputes the last
+# REVISE_WEEKS weeks plus any new ones: the CSV is truncated at the first changed
+# row and the recomputed rows are appended, so cost follows new weeks, not history.
+
+# ------------------- SETTINGS -------------------
+WINDOWS       = [4]     # moving-average lengths in weeks -> <col>_ma4, <col>_ma8, …
+REVISE_WEEKS  = 8       # recent weeks recomputed on every refresh (Trends tail rescaling, late finals)
+STATE_VERSION = 1
+
+def ma_col(col: str, window: int) -> str:
+    return f"{col}_ma{window}"
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over up to `window` values, NaNs skipped (rolling(w, min_periods=1).mean()).
+
+    Each window is summed on its own rather than as a running sum, so a value doesn't
+    depend on where the series starts and appended rows match a full rebuild exactly.
+    """
+    if window < 1:
+        raise ValueError(f"window must be >= 1, got {window}")
+    values = np.asarray(values, dtype="float64")
+    if len(values) == 0:
+        return values.copy()
+    v = np.concatenate([np.full(window - 1, np.nan), values])
+    win = np.lib.stride_tricks.sliding_window_view(v, window)
+    counts = (~np.isnan(win)).sum(axis=1)
+    sums = np.nansum(win, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+def add_features(merged: pd.DataFrame, value_cols: Optional[List[str]] = None,
+                 windows: Optional[List[int]] = None, history: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """Calendar columns + moving averages (defaults to every *_near_me column, WINDOWS).
+
+    `history` holds the value columns of the weeks just before `merged`; it seeds the
+    windows but isn't returned.
+    """
+    df = merged.copy()
+    ws = pd.to_datetime(df["week_start"])
+    df["week_end"] = ws + pd.Timedelta(days=6)
+    df["month"] = ws.dt.month
+    df["year"]  = ws.dt.year
+    if value_cols is None:
+        value_cols = [c for c in df.columns if c.endswith("_near_me")]
+    for w in windows or WINDOWS:
+        for col in value_cols:
+            v = df[col].to_numpy(dtype="float64")
+            if history is not None:
+                v = np.concatenate([history[col].to_numpy(dtype="float64"), v])
+            df[ma_col(col, w)] = rolling_mean(v, w)[len(v) - len(df):]
+    return df
+
+# ------------------- STATE -------------------
+def state_path(tidy_path: str) -> str:
+    return os.path.splitext(tidy_path)[0] + ".state.json"
+
+def load_state(tidy_path: str) -> Optional[Dict]:
+    p = state_path(tidy_path)
+    if not (os.path.exists(p) and os.path.exists(tidy_path)):
+        return None
+    try:
+        with open(p, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get("version") != STATE_VERSION or state.get("csv_bytes") != os.path.getsize(tidy_path):
+        return None     # CSV was rewritten by something else
+    return state
+
+def revise_from(state: Dict) -> date:
+    """First week an append may touch; everything before it is frozen."""
+    tail = state["tail"]
+    return date.fromisoformat(tail[max(0, len(tail) - REVISE_WEEKS)]["week_start"])
+
+def tail_length(windows: List[int]) -> int:
+    return max(windows) - 1 + REVISE_WEEKS
+
+def _write_state(tidy_path: str, columns: List[str], value_cols: List[str], windows: List[int],
+                 rows: int, tail: List[Dict], fingerprint: Optional[Callable[[date], str]]):
+    state = {"version": STATE_VERSION, "columns": columns, "value_cols": value_cols,
+             "windows": windows, "rows": rows, "tail": tail,
+             "csv_bytes": os.path.getsize(tidy_path)}
+    if fingerprint is not None and tail:
+        state["history"] = fingerprint(revise_from(state))
+    tmp = state_path(tidy_path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1, default=str)
+    os.replace(tmp, state_path(tidy_path))
+
+def _tail_rows(df: pd.DataFrame, value_cols: List[str], offsets: List[int]) -> List[Dict]:
+    vals = df[value_cols].to_numpy(dtype="float64")
+    return [{"week_start": pd.Timestamp(w).date().isoformat(), "offset": int(o),
+             "values": [None if np.isnan(v) else float(v) for v in row]}
+            for w, o, row in zip(df["week_start"], offsets, vals)]
+
+def _write_rows(f, df: pd.DataFrame, n_tail: int) -> List[int]:
+    """Write df's rows at f's position; returns byte offsets of the last n_tail rows."""
+    head, tail = df.iloc[:len(df) - n_tail], df.iloc[len(df) - n_tail:]
+    if len(head):
+        f.write(head.to_csv(index=False, header=False).encode("utf-8"))
+    offsets = []
+    for line in tail.to_csv(index=False, header=False).splitlines(keepends=True):
+        offsets.append(f.tell())
+        f.write(line.encode("utf-8"))
+    return offsets
+
+# ------------------- BUILD / APPEND -------------------
+def write_features(merged: pd.DataFrame, tidy_path: str, value_cols: Optional[List[str]] = None,
+                   windows: Optional[List[int]] = None,
+                   fingerprint: Optional[Callable[[date], str]] = None) -> pd.DataFrame:
+    """Full rebuild: features over the whole table, written with a fresh state file.
+
+    fingerprint(since) should summarise the inputs before `since`; append_features()
+    falls back to a rebuild when it no longer matches (e.g. a school's old finals changed).
+    """
+    windows = list(windows or WINDOWS)
+    if value_cols is None:
+        value_cols = [c for c in merged.columns if c.endswith("_near_me")]
+    df = add_features(merged, value_cols, windows)
+    n_tail = min(len(df), tail_length(windows))
+    tmp = tidy_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(df.iloc[:0].to_csv(index=False).encode("utf-8"))
+        offsets = _write_rows(f, df, n_tail)
+    os.replace(tmp, tidy_path)
+    _write_state(tidy_path, list(df.columns), value_cols, windows, len(df),
+                 _tail_rows(df.iloc[len(df) - n_tail:], value_cols, offsets), fingerprint)
+    return df
+
+def append_features(merged_tail: pd.DataFrame, tidy_path: str, windows: Optional[List[int]] = None,
+                    fingerprint: Optional[Callable[[date], str]] = None) -> Optional[pd.DataFrame]:
+    """Recompute and append only the weeks in `merged_tail` (weeks >= revise_from(state)).
+
+    Returns the rewritten rows, or None when the state can't be used (missing, other
+    columns or windows, tail reaching back past the frozen history, or a changed
+    fingerprint); the caller should then call write_features() on the full table.
+    """
+    state = load_state(tidy_path)
+    if state is None or not state["tail"]:
+        return None
+    windows = list(windows or state["windows"])
+    value_cols = state["value_cols"]
+    if windows != state["windows"] or any(c not in merged_tail.columns for c in value_cols):
+        return None
+    since = revise_from(state)
+    if fingerprint is not None and state.get("history") != fingerprint(since):
+        return None
+    merged_tail = merged_tail.sort_values("week_start")
+    if merged_tail.empty:
+        return merged_tail
+    weeks = pd.to_datetime(merged_tail["week_start"])
+    first = weeks.iloc[0].date()
+    if first < since:
+        return None
+
+    # rows already in the CSV before `first` stay; their raw values seed the windows
+    tail = state["tail"]
+    keep = [r for r in tail if date.fromisoformat(r["week_start"]) < first]
+    cut = tail[len(keep)]["offset"] if len(keep) < len(tail) else state["csv_bytes"]
+    history = pd.DataFrame([r["values"] for r in keep], columns=value_cols, dtype="float64")
+    feats = add_features(merged_tail.reset_index(drop=True), value_cols, windows, history)
+    if list(feats.columns) != state["columns"]:
+        return None
+
+    n_tail = min(len(feats), tail_length(windows))
+    with open(tidy_path, "r+b") as f:
+        f.truncate(cut)
+        f.seek(cut)
+        offsets = _write_rows(f, feats, n_tail)
+    new_tail = keep + _tail_rows(feats.iloc[len(feats) - n_tail:], value_cols, offsets)
+    new_tail = new_tail[-tail_length(windows):]
+    rows = state["rows"] - (len(tail) - len(keep)) + len(feats)
+    _write_state(tidy_path, state["columns"], value_cols, windows, rows, new_tail, fingerprint)
+    return feats
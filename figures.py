@@ -0,0 +1,342 @@
+import os, sys, json, hashlib, inspect, calendar
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+# Headless renderer for the slide charts in data-visuals.ipynb. The shared inputs
+# (weekly table, finals windows, finals spans) are built once; each figure declares
+# the slice of them it draws from, and is only redrawn when the hash of that slice,
+# the style and its own draw code changed since the last render. Figures that do
+# need drawing go to worker processes on the Agg backend.
+#
+#   python figures.py                     # redraw what changed into slides/figs
+#   python figures.py --force --only=01_trend_finals_clean
+
+# ------------------- SETTINGS -------------------
+OUTDIR    = "slides/figs"
+MANIFEST  = os.path.join(OUTDIR, ".figures.json")
+PROCESSES = os.cpu_count() or 1
+FIRST_WEEK = "2018-12-31"
+
+STYLE = {   # rcParams of the notebook's style cell
+    "font.family": ["Arial", "DejaVu Sans"],
+    "font.size": 12,
+    "axes.titlesize": 15,
+    "axes.labelsize": 12,
+    "legend.fontsize": 11,
+    "axes.edgecolor": "#EF6922",
+    "axes.linewidth": 0.8,
+    "axes.facecolor": "white",
+    "figure.facecolor": "white",
+    "xtick.color": "#222222",
+    "ytick.color": "#222222",
+    "grid.linestyle": "--",
+    "grid.alpha": 0.15,
+}
+
+# ------------------- SHARED INPUTS -------------------
+def notebook_weekly(finals: pd.DataFrame, trends: pd.DataFrame) -> pd.DataFrame:
+    """The notebook's weekly table: monthly Trends carried onto W-MON weeks + finals counts."""
+    from finals_index import FinalsIndex
+    finals_weekly = FinalsIndex(finals).weekly_intensity()
+    finals_weekly["is_finals_week"] = (finals_weekly["finals_school_count_week"] > 0).astype(int)
+
+    wk = pd.DataFrame({"week_start": pd.date_range(FIRST_WEEK, pd.Timestamp.today(), freq="W-MON")})
+    wk["month_start"] = wk["week_start"].values.astype("datetime64[M]")
+    m = trends.copy()
+    m["month_start"] = pd.to_datetime(m["date"]).values.astype("datetime64[M]")
+    m = m.set_index("month_start")[["pizza_near_me", "coffee_near_me"]]
+    weekly = wk.merge(m, left_on="month_start", right_index=True, how="left").drop(columns=["month_start"])
+    weekly[["pizza_near_me", "coffee_near_me"]] = weekly[["pizza_near_me", "coffee_near_me"]].ffill()
+
+    weekly = weekly.merge(finals_weekly, on="week_start", how="left").fillna(
+        {"finals_school_count_week": 0, "is_finals_week": 0})
+    weekly["year"] = weekly["week_start"].dt.year
+    weekly["month"] = weekly["week_start"].dt.month
+    weekly["pizza_ma4"] = weekly["pizza_near_me"].rolling(4, min_periods=1).mean()
+    return weekly.sort_values("week_start").reset_index(drop=True)
+
+def finals_spans(weekly: pd.DataFrame) -> pd.DataFrame:
+    """One shaded span per May / December month with schools in finals."""
+    wk = weekly[(weekly["finals_school_count_week"] > 0) & (weekly["month"].isin([5, 12]))]
+    g = wk.groupby(wk["week_start"].dt.to_period("M"))["week_start"]
+    spans = pd.DataFrame({"start": g.min().dt.normalize(),
+                          "end": (g.max() + pd.Timedelta(days=6)).dt.normalize()})
+    return spans.sort_values("start").reset_index(drop=True)
+
+def prepare_inputs(finals_csv: Optional[str] = None, trends_csv: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    from scrape_finals import FINALS_CSV, TRENDS_CSV
+    from storage import load_table
+    finals = load_table(finals_csv or FINALS_CSV, "finals", timestamps=True)
+    trends = load_table(trends_csv or TRENDS_CSV, "trends", timestamps=True)
+    for c in ["finals_start", "finals_end"]:
+        finals[c] = pd.to_datetime(finals[c], errors="coerce")
+    finals = finals.dropna(subset=["finals_start", "finals_end"]).reset_index(drop=True)
+    weekly = notebook_weekly(finals, trends)
+    return {"weekly": weekly, "finals": finals, "spans": finals_spans(weekly)}
+
+# ------------------- FIGURES -------------------
+def _span_labels(ax, spans, min_days, fontsize):
+    for s, e in zip(spans["start"], spans["end"]):
+        ax.axvspan(s, e, color="#ffba7d", alpha=0.18, lw=0)
+        if (e - s).days >= min_days:
+            y_low, y_high = ax.get_ylim()
+            ax.text(s + (e - s) / 2, y_low + 0.9 * (y_high - y_low), "Finals", ha="center", va="center",
+                    fontsize=fontsize, color="#333",
+                    bbox=dict(boxstyle="round,pad=0.2", facecolor="white", alpha=0.55, edgecolor="none"))
+
+def _month_axis(ax, plt):
+    import matplotlib.dates as mdates
+    ax.xaxis.set_major_locator(mdates.MonthLocator(bymonth=[5, 12]))
+    ax.xaxis.set_major_formatter(mdates.DateFormatter("%b %Y"))
+    plt.setp(ax.get_xticklabels(), rotation=30, ha="right")
+
+def draw_trend_finals(d, plt):
+    weekly, spans = d["weekly"], d["spans"]
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.plot(weekly["week_start"], weekly["pizza_ma4"], linewidth=2, color="#B14D3A",
+            label="Pizza searches (4-wk avg)")
+    ax.legend(loc="upper left", frameon=False, fontsize=11, labelcolor="#444")
+    _span_labels(ax, spans, 10, 11)
+    _month_axis(ax, plt)
+    xmin = weekly["week_start"].min().replace(day=1)
+    xmax = weekly["week_start"].max().replace(day=1) + pd.offsets.MonthEnd(0)
+    ax.set_xlim(xmin, xmax)
+    ax.set_title("Pizza searches spike during finals weeks across Boston universities", pad=12)
+    ax.set_ylabel("Google Trends index (0–100)")
+    ax.set_xlabel("Date")
+    ax.grid(axis="y", linestyle="--", alpha=0.15)
+    return fig
+
+def draw_event_study(d, plt):
+    from event_study import event_study
+    es = event_study(d["weekly"], d["finals"], keywords=["pizza_near_me"], leads=3, lags=2,
+                     processes=1).set_index("rel_week")
+    avg = es["mean"]
+    fig, ax = plt.subplots(figsize=(7.2, 5))
+    ax.fill_between(avg.index, es["ci_low"], es["ci_high"], color="#B14D3A", alpha=0.2, lw=0)
+    ax.plot(avg.index, avg, marker="o", linewidth=2, color="#B14D3A", label="Avg pizza searches")
+    ax.axvline(0, linestyle="--", color="#999")
+    ax.axvspan(0, 2, color="#ffba7d", alpha=0.25, lw=0)
+    baseline = avg.loc[-3]
+    ax.axhline(baseline, linestyle=":", color="#444", alpha=0.7)
+    ax.text(2.2, baseline + 0.2, "Baseline (−3 weeks)", color="#444", fontsize=9)
+    ax.annotate(f"+{avg.loc[0] - baseline:.1f} pts at finals start",
+                xy=(0, avg.loc[0]), xycoords="data", xytext=(-2.2, avg.loc[0] + 2), textcoords="data",
+                arrowprops=dict(arrowstyle="->", color="#333"), fontsize=10, color="#333")
+    labels = {-3: "3w before", -2: "2w before", -1: "1w before", 0: "Finals", 1: "1w after", 2: "2w after"}
+    ax.set_xticks(list(labels.keys()))
+    ax.set_xticklabels(list(labels.values()))
+    ax.set_ylim(52, 60)
+    ax.set_xlabel("Weeks relative to finals start")
+    ax.set_ylabel("Average ‘pizza near me’")
+    ax.set_title("Pre-finals ramp in pizza interest")
+    ax.grid(axis="y", linestyle="--", alpha=0.15)
+    ax.legend(frameon=False, loc="upper left")
+    return fig
+
+def draw_overlap_heatmap(d, plt):
+    w = d["weekly"]
+    mat = (w.groupby([w["week_start"].dt.year.rename("year"), w["week_start"].dt.month.rename("month")])
+            ["finals_school_count_week"].max().unstack("month")
+            .reindex(columns=range(1, 13)).fillna(0).sort_index())
+    years = list(mat.index)
+    mat = mat.to_numpy(dtype=float)
+    fig, ax = plt.subplots(figsize=(12, 4.6))
+    im = ax.imshow(mat, cmap="Oranges", vmin=0, vmax=max(1, mat.max()))
+    ax.set_xticks(np.arange(12))
+    ax.set_xticklabels([calendar.month_abbr[m] for m in range(1, 13)])
+    ax.set_yticks(np.arange(len(years)))
+    ax.set_yticklabels(years)
+    ax.set_xlabel("Month")
+    ax.set_ylabel("Year")
+    ax.set_title("Finals overlap intensity (max schools in finals by month)", pad=10)
+    for i, j in zip(*np.nonzero(mat.astype(int))):
+        ax.text(j, i, str(int(mat[i, j])), ha="center", va="center", color="#3a2a20", fontsize=10)
+    ax.set_xticks(np.arange(-.5, 12, 1), minor=True)
+    ax.set_yticks(np.arange(-.5, len(years), 1), minor=True)
+    ax.grid(which="minor", color=(0, 0, 0, 0.08), linestyle="-", linewidth=0.8)
+    ax.tick_params(which="minor", bottom=False, left=False)
+    cbar = fig.colorbar(im, ax=ax, fraction=0.02, pad=0.02)
+    cbar.set_label("Schools in finals (monthly max)")
+    return fig
+
+def draw_year_month_heatmap(d, plt):
+    w = d["weekly"]
+    heat = (w.groupby([w["week_start"].dt.year.rename("year"), w["week_start"].dt.month.rename("month")])
+             ["pizza_near_me"].mean().unstack("month").sort_index())
+    fig, ax = plt.subplots(figsize=(10.5, 6), dpi=140)
+    im = ax.imshow(heat.values, aspect="auto", cmap="Oranges",
+                   vmin=np.nanmin(heat.values), vmax=np.nanmax(heat.values))
+    ax.set_yticks(range(len(heat.index)))
+    ax.set_yticklabels(heat.index)
+    ax.set_xticks(range(12))
+    ax.set_xticklabels([calendar.month_abbr[m] for m in range(1, 13)])
+    ax.set_title("Average monthly interest in ‘pizza near me’ across years", pad=10)
+    ax.set_xlabel("Month")
+    ax.set_ylabel("Year")
+    for m in [5, 12]:
+        ax.axvline(m - 1, color="#333", linestyle="--", linewidth=0.6, alpha=0.4)
+    for i, j in zip(*np.nonzero(~np.isnan(heat.values))):
+        ax.text(j, i, f"{heat.values[i, j]:.0f}", ha="center", va="center", fontsize=8, color="#222")
+    cbar = fig.colorbar(im, ax=ax, fraction=0.04, pad=0.02)
+    cbar.set_label("Google Trends index (0–100)")
+    return fig
+
+def draw_overlap_grouped(d, plt):
+    w = d["weekly"]
+    w = w.assign(year=w["week_start"].dt.year,
+                 season=w["week_start"].dt.month.map({5: "May", 12: "Dec"}))
+    w = w[w["season"].notna() & (w["year"] >= 2020)]
+    pivot = (w.groupby(["year", "season"])["finals_school_count_week"].max()
+              .unstack("season").reindex(columns=["May", "Dec"]).fillna(0))
+    fig, ax = plt.subplots(figsize=(10, 5), dpi=150)
+    bar_width = 0.35
+    x = np.arange(len(pivot.index))
+    ax.bar(x - bar_width / 2, pivot["May"], width=bar_width, color="#F47C3C", label="May Finals")
+    ax.bar(x + bar_width / 2, pivot["Dec"], width=bar_width, color="#AB4E37", label="December Finals")
+    ax.set_xticks(x)
+    ax.set_xticklabels(pivot.index, rotation=0)
+    ax.set_ylabel("Peak # of universities in finals")
+    ax.set_title("Finals overlap by year and season (Boston universities)")
+    ax.legend(frameon=False)
+    ax.spines[["top", "right"]].set_visible(False)
+    ax.grid(axis="y", linestyle="--", alpha=0.15)
+    return fig
+
+def draw_pizza_vs_coffee(d, plt):
+    weekly, spans = d["weekly"], d["spans"]
+    fig, ax = plt.subplots(figsize=(12, 6), dpi=150)
+    ax.plot(weekly["week_start"], weekly["pizza_ma4"], linewidth=2.2, color="#F23F1C",
+            label="Pizza searches (4-wk avg)")
+    ax.plot(weekly["week_start"], weekly["coffee_near_me"].rolling(4, min_periods=1).mean(),
+            linewidth=2.0, color="#412D08", label="Coffee searches (4-wk avg)")
+    _span_labels(ax, spans, 7, 10)
+    _month_axis(ax, plt)
+    ax.set_title("Pizza vs. Coffee searches during Boston university finals weeks", pad=11)
+    ax.set_ylabel("Google Trends index (0–100)")
+    ax.set_xlabel("Date")
+    ax.legend(loc="upper left", frameon=False)
+    ax.grid(axis="y", linestyle="--", alpha=0.15)
+    return fig
+
+# name -> draw function, savefig dpi, and the slice of the shared inputs it reads
+FIGURES = {
+    "01_trend_finals_clean": {
+        "draw": draw_trend_finals, "dpi": 200,
+        "inputs": lambda x: {"weekly": x["weekly"][["week_start", "pizza_ma4"]], "spans": x["spans"]}},
+    "04_event_study_polished": {
+        "draw": draw_event_study, "dpi": 220,
+        "inputs": lambda x: {"weekly": x["weekly"][["week_start", "pizza_near_me"]],
+                             "finals": x["finals"][["finals_start", "finals_end"]]}},
+    "03_finals_overlap_heatmap": {
+        "draw": draw_overlap_heatmap, "dpi": 200,
+        "inputs": lambda x: {"weekly": x["weekly"][["week_start", "finals_school_count_week"]]}},
+    "03_year_month_heatmap": {
+        "draw": draw_year_month_heatmap, "dpi": None,
+        "inputs": lambda x: {"weekly": x["weekly"][["week_start", "pizza_near_me"]]}},
+    "03_finals_overlap_grouped": {
+        "draw": draw_overlap_grouped, "dpi": 200,
+        "inputs": lambda x: {"weekly": x["weekly"][["week_start", "finals_school_count_week"]]}},
+    "03_pizza_vs_coffee": {
+        "draw": draw_pizza_vs_coffee, "dpi": 200,
+        "inputs": lambda x: {"weekly": x["weekly"][["week_start", "pizza_ma4", "coffee_near_me"]],
+                             "spans": x["spans"]}},
+}
+
+# ------------------- CONTENT HASH -------------------
+def _code(fn) -> str:
+    """Source of a draw function plus the module helpers it calls."""
+    src = inspect.getsource(fn)
+    helpers = [h for h in (_span_labels, _month_axis) if h.__name__ in src]
+    return src + "".join(inspect.getsource(h) for h in helpers)
+
+def figure_hash(name: str, data: Dict[str, pd.DataFrame], style: Dict = STYLE) -> str:
+    spec = FIGURES[name]
+    h = hashlib.sha256()
+    for key in sorted(data):
+        df = data[key]
+        h.update(f"{key}:{','.join(map(str, df.columns))}:{len(df)}\n".encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    h.update(json.dumps(style, sort_keys=True).encode("utf-8"))
+    h.update(f"dpi={spec['dpi']}\n".encode("utf-8"))
+    h.update(_code(spec["draw"]).encode("utf-8"))
+    return h.hexdigest()
+
+def load_manifest(path: str = MANIFEST) -> Dict[str, str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(manifest: Dict[str, str], path: str = MANIFEST):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+# ------------------- RENDER -------------------
+def render_one(name: str, data: Dict[str, pd.DataFrame], out_path: str, style: Dict = STYLE) -> str:
+    """Draw one figure headlessly (runs in a worker)."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    spec = FIGURES[name]
+    with matplotlib.rc_context(style):
+        fig = spec["draw"](data, plt)
+        fig.tight_layout()
+        tmp = out_path + ".tmp.png"
+        kw = {"dpi": spec["dpi"]} if spec["dpi"] else {}
+        fig.savefig(tmp, bbox_inches="tight", **kw)
+        plt.close(fig)
+    os.replace(tmp, out_path)
+    return name
+
+def render_figures(inputs: Optional[Dict[str, pd.DataFrame]] = None, outdir: str = OUTDIR,
+                   only: Optional[List[str]] = None, force: bool = False,
+                   processes: int = PROCESSES, style: Dict = STYLE) -> List[str]:
+    """Redraw the figures whose inputs, style or code changed; returns the names drawn."""
+    if inputs is None:
+        inputs = prepare_inputs()
+    names = only or list(FIGURES)
+    unknown = [n for n in names if n not in FIGURES]
+    if unknown:
+        raise ValueError(f"unknown figure(s): {', '.join(unknown)}")
+    os.makedirs(outdir, exist_ok=True)
+    manifest_path = os.path.join(outdir, os.path.basename(MANIFEST))
+    manifest = load_manifest(manifest_path)
+
+    todo = []
+    for name in names:
+        data = FIGURES[name]["inputs"](inputs)
+        digest = figure_hash(name, data, style)
+        out = os.path.join(outdir, name + ".png")
+        if not force and manifest.get(name) == digest and os.path.exists(out):
+            print(f"  = {name} unchanged")
+            continue
+        todo.append((name, data, out, digest))
+
+    if processes <= 1 or len(todo) <= 1:
+        done = [render_one(n, d, o, style) for n, d, o, _ in todo]
+    else:
+        with ProcessPoolExecutor(max_workers=min(processes, len(todo))) as pool:
+            done = list(pool.map(render_one, [t[0] for t in todo], [t[1] for t in todo],
+                                 [t[2] for t in todo], [style] * len(todo)))
+    for name, _, out, digest in todo:
+        manifest[name] = digest
+        print(f"✅ {out}")
+    save_manifest(manifest, manifest_path)
+    return done
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(prog="figures.py", description="Render the slide figures headlessly")
+    p.add_argument("--only", help="comma-separated figure names, e.g. 03_pizza_vs_coffee")
+    p.add_argument("--force", action="store_true", help="redraw even if nothing changed")
+    p.add_argument("--processes", type=int, default=PROCESSES)
+    p.add_argument("--outdir", default=OUTDIR)
+    args = p.parse_args(sys.argv[1:])
+    render_figures(outdir=args.outdir, only=args.only.split(",") if args.only else None,
+                   force=args.force, processes=args.processes)
@@ -0,0 +1,98 @@
+from datetime import timedelta
+from typing import Callable, Dict, List, Pattern
+from ics_stream import iter_lines, stream_events
+from event_store import EventStore
+from profiling import PROFILER, timed
+
+# Finals extraction shared by scrape_finals.py and append_finals.py. Each script
+# builds one FinalsExtractor from its own fetcher, keyword pattern, year window and
+# link discovery; everything from an .ics URL to finals windows lives here.
+
+def guess_term(month: int) -> str:
+    if month in (4,5,6):  return "Spring"
+    if month in (11,12):  return "Fall"
+    return "Unknown"
+
+class FinalsExtractor:
+    """.ics feeds -> finals windows for one fetcher / keyword pattern / year window."""
+
+    def __init__(self, fetcher, keys: Pattern, min_year: int, max_year: int,
+                 discover: Callable[[str], List[str]]):
+        self.fetcher = fetcher
+        self.keys = keys
+        self.min_year = min_year
+        self.max_year = max_year
+        self.discover = discover
+
+    @timed("parse_ics")
+    def parse_ics(self, url: str) -> List[Dict]:
+        """Return list of events (title, description, start_date, end_date, source_url)."""
+        from ics import Calendar   # only this (non-streaming) path needs the ics library
+        try:
+            r = self.fetcher.get(url)
+            if r.status_code != 200:
+                print(f"    ! HTTP {r.status_code} for ICS {url}")
+                return []
+            with PROFILER.stage("ics_parse"):
+                cal = Calendar(r.text)
+            out = []
+            for ev in cal.events:
+                # Event times: ics uses inclusive start, exclusive end for all-day
+                start = ev.begin.date() if hasattr(ev.begin, "date") else None
+                end   = ev.end.date()   if hasattr(ev.end, "date")   else None
+                if not start or not end:
+                    continue
+                out.append({
+                    "title": (ev.name or "").strip(),
+                    "description": (ev.description or "").strip(),
+                    "start": start,
+                    "end": end - timedelta(days=1),   # normalize to inclusive end date
+                    "source_url": url
+                })
+            return out
+        except Exception as e:
+            print(f"    ! Error parsing ICS {url}: {e}")
+            return []
+
+    def finals_store(self, url: str, r, school: str = "") -> EventStore:
+        return stream_events(iter_lines(r.iter_text()), url, self.keys, school).finals(self.min_year, self.max_year)
+
+    def finals_from_response(self, url: str, r) -> List[Dict]:
+        return self.finals_store(url, r).to_rows()
+
+    @timed("finals_from_ics")
+    def finals_store_from_ics(self, url: str, school: str = "") -> EventStore:
+        """Streamed finals_from_events(parse_ics(url)) as an EventStore; no ics.Calendar."""
+        try:
+            r = self.fetcher.get(url, stream=True)
+            if r.status_code != 200:
+                print(f"    ! HTTP {r.status_code} for ICS {url}")
+                return EventStore()
+            return self.finals_store(url, r, school)
+        except Exception as e:
+            print(f"    ! Error parsing ICS {url}: {e}")
+            return EventStore()
+
+    def finals_from_ics(self, url: str) -> List[Dict]:
+        return self.finals_store_from_ics(url).to_rows()
+
+    @timed("finals_from_events")
+    def finals_from_events(self, events: List[Dict]) -> List[Dict]:
+        return EventStore.from_events(events, self.keys).finals(self.min_year, self.max_year).to_rows()
+
+    def crawl_school(self, item: Dict) -> EventStore:
+        """Discover and extract one school's finals windows (runs on a crawl worker)."""
+        school, start = item["school"], item["start"]
+        print(f"{school} → {start}")
+        ics_links = self.discover(start)
+        if not ics_links:
+            print(f"  [{school}] (no ICS links found on initial pages)")
+            return EventStore()
+        stores = []
+        for ics in ics_links:
+            print(f"  [{school}] ICS: {ics}")
+            finals = self.finals_store_from_ics(ics, school)
+            if not len(finals):
+                print(f"    [{school}] (no finals-like events in this ICS)")
+            stores.append(finals)
+        return EventStore.concat(stores)
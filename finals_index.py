@@ -0,0 +1,125 @@
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+from finals_weekly import clean_intervals, merge_runs, week_ordinals, week_start_from_ordinal
+
+# Sorted-endpoint index over finals intervals, built once from the finals CSV.
+# Each school's windows are first merged into disjoint runs (at day granularity
+# for date queries, and at week granularity for weekly counts). With disjoint runs
+# per school, "schools in finals on D" is #(starts <= D) - #(ends < D): two binary
+# searches. Range queries scan only runs starting in [a - longest run, b]. The
+# cleaned windows themselves are kept too, for the event study's per-window alignment.
+
+def to_day(d) -> int:
+    """Days since 1970-01-01. ISO dates go through numpy, so years past pandas'
+    Timestamp range (2262) still work; other strings fall back to pd.Timestamp."""
+    try:
+        return int(np.datetime64(d, "D").astype(np.int64))
+    except ValueError:
+        return int(np.datetime64(pd.Timestamp(d).date(), "D").astype(np.int64))
+
+class FinalsIndex:
+    """Point / range / overlap queries over finals windows in logarithmic time."""
+
+    def __init__(self, df_finals: pd.DataFrame):
+        df_finals = df_finals.dropna(subset=["school", "finals_start", "finals_end"])
+        self.names = np.asarray(pd.unique(df_finals["school"].to_numpy()), dtype=object)
+        if df_finals.empty:
+            school = start = end = np.array([], dtype=np.int64)
+        else:
+            school, start, end = clean_intervals(df_finals)
+        self.windows = (school, start, end)      # cleaned, unmerged; see distinct_windows()
+
+        # day-level runs, ordered by start
+        s, a, b = merge_runs(school, start, end) if len(school) else (school, start, end)
+        order = np.argsort(a, kind="stable")
+        self.school, self.start, self.end = s[order], a[order], b[order]
+        self.end_sorted = np.sort(self.end)
+        self.max_len = int((self.end - self.start).max()) if len(self.start) else 0
+
+        # week-level runs (distinct schools per week never double count)
+        if len(school):
+            _, ws, we = merge_runs(school, week_ordinals(start), week_ordinals(end))
+        else:
+            ws = we = np.array([], dtype=np.int64)
+        self.week_start_sorted = np.sort(ws)
+        self.week_end_sorted = np.sort(we)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "FinalsIndex":
+        return cls(pd.read_csv(path, usecols=["school", "finals_start", "finals_end"]))
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    # ---- point queries ----
+    def count_on(self, day) -> int:
+        """Number of schools in finals on `day`."""
+        d = to_day(day)
+        return int(np.searchsorted(self.start, d, side="right")
+                   - np.searchsorted(self.end_sorted, d, side="left"))
+
+    def counts_on(self, days) -> np.ndarray:
+        """Vectorized count_on for an array of dates."""
+        d = pd.to_datetime(pd.Series(days)).to_numpy(dtype="datetime64[D]").astype(np.int64)
+        return (np.searchsorted(self.start, d, side="right")
+                - np.searchsorted(self.end_sorted, d, side="left"))
+
+    def schools_on(self, day) -> List[str]:
+        return self.schools_between(day, day)
+
+    # ---- range queries ----
+    def overlap_count(self, start, end) -> int:
+        """Number of (per-school merged) finals runs overlapping [start, end]."""
+        a, b = to_day(start), to_day(end)
+        return int(np.searchsorted(self.start, b, side="right")
+                   - np.searchsorted(self.end_sorted, a, side="left"))
+
+    def _candidates(self, a: int, b: int) -> np.ndarray:
+        lo = np.searchsorted(self.start, a - self.max_len, side="left")
+        hi = np.searchsorted(self.start, b, side="right")
+        hit = np.flatnonzero(self.end[lo:hi] >= a) + lo
+        return hit
+
+    def schools_between(self, start, end) -> List[str]:
+        """Schools with at least one finals day in [start, end], in first-seen order."""
+        hit = self._candidates(to_day(start), to_day(end))
+        return list(self.names[np.unique(self.school[hit])])
+
+    def count_between(self, start, end) -> int:
+        hit = self._candidates(to_day(start), to_day(end))
+        return int(len(np.unique(self.school[hit])))
+
+    def distinct_windows(self, schools: Optional[List[str]] = None):
+        """(start days, end days) of the distinct raw finals windows, sorted; optionally
+        only those of `schools`. The event study aligns on these, not on merged runs."""
+        school, start, end = self.windows
+        if schools is not None:
+            keep = np.isin(school, np.flatnonzero(np.isin(self.names, list(schools))))
+            start, end = start[keep], end[keep]
+        if not len(start):
+            return start, end
+        pairs = np.unique(np.stack([start, end], axis=1), axis=0)
+        return pairs[:, 0], pairs[:, 1]
+
+    # ---- weekly ----
+    def weekly_counts(self, week_starts) -> np.ndarray:
+        """Distinct schools in finals during each Monday-based week in `week_starts`."""
+        days = pd.to_datetime(pd.Series(week_starts)).to_numpy(dtype="datetime64[D]").astype(np.int64)
+        w = week_ordinals(days)
+        return (np.searchsorted(self.week_start_sorted, w, side="right")
+                - np.searchsorted(self.week_end_sorted, w, side="left"))
+
+    def weekly_intensity(self, first: Optional[str] = None, last: Optional[str] = None) -> pd.DataFrame:
+        """week_start + finals_school_count_week for every week in range with count > 0."""
+        if not len(self.week_start_sorted):
+            return pd.DataFrame({"week_start": pd.to_datetime([]),
+                                 "finals_school_count_week": np.array([], dtype=np.int64)})
+        lo = self.week_start_sorted[0] if first is None else week_ordinals(np.int64(to_day(first)))
+        hi = self.week_end_sorted[-1] if last is None else week_ordinals(np.int64(to_day(last)))
+        w = np.arange(lo, hi + 1)
+        counts = (np.searchsorted(self.week_start_sorted, w, side="right")
+                  - np.searchsorted(self.week_end_sorted, w, side="left"))
+        keep = counts > 0
+        return pd.DataFrame({"week_start": week_start_from_ordinal(w[keep]),
+                             "finals_school_count_week": counts[keep]})
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+# Vectorized interval -> week engine. Weeks are Monday-based integer ordinals
+# (days since 1970-01-01 is a Thursday, so +3 lines Mondays up on multiples of 7).
+# Intervals go straight to weekly distinct-school counts with a difference-array
+# sweep; nothing is ever expanded to one row per finals day.
+
+EPOCH_SHIFT = 3
+
+def day_ordinals(values) -> np.ndarray:
+    """Dates / strings / Timestamps -> int64 days since 1970-01-01 (NaT -> min int64)."""
+    return pd.to_datetime(pd.Series(values)).to_numpy(dtype="datetime64[D]").astype(np.int64)
+
+def week_ordinals(days: np.ndarray) -> np.ndarray:
+    return (days + EPOCH_SHIFT) // 7
+
+def week_start_from_ordinal(weeks: np.ndarray) -> pd.DatetimeIndex:
+    return pd.to_datetime(weeks * 7 - EPOCH_SHIFT, unit="D")
+
+def clean_intervals(df_finals: pd.DataFrame):
+    """(school codes, start days, end days) for rows with valid start <= end."""
+    start = day_ordinals(df_finals["finals_start"])
+    end   = day_ordinals(df_finals["finals_end"])
+    nat = np.datetime64("NaT").astype(np.int64)
+    ok = (start != nat) & (end != nat) & (end >= start)
+    codes, _ = pd.factorize(df_finals["school"].to_numpy())
+    return codes[ok], start[ok], end[ok]
+
+def merge_runs(school: np.ndarray, start: np.ndarray, end: np.ndarray, gap: int = 1):
+    """Merge each school's overlapping / touching spans; returns sorted (school, start, end)."""
+    order = np.lexsort((start, school))
+    school, start, end = school[order], start[order], end[order]
+    run_end = pd.Series(end).groupby(school).cummax().to_numpy()
+    new = np.ones(len(start), dtype=bool)
+    new[1:] = (school[1:] != school[:-1]) | (start[1:] > run_end[:-1] + gap)
+    idx = np.flatnonzero(new)
+    return school[idx], start[idx], np.maximum.reduceat(end, idx)
+
+def weekly_school_counts(df_finals: pd.DataFrame) -> pd.DataFrame:
+    """Distinct schools with at least one finals day in each Monday-based week.
+
+    Per school, intervals are first merged at week granularity by merge_runs() (so
+    overlapping or duplicate windows count once), then +1/-1 are scattered at the
+    covered week boundaries and a cumulative sum gives the count for every week.
+    Returns week_start (datetime64) + finals_school_count_week for weeks with count > 0.
+    """
+    empty = pd.DataFrame({"week_start": pd.to_datetime([]),
+                          "finals_school_count_week": np.array([], dtype=np.int64)})
+    if df_finals.empty:
+        return empty
+    school, start, end = clean_intervals(df_finals)
+    if len(school) == 0:
+        return empty
+    _, seg_start, seg_end = merge_runs(school, week_ordinals(start), week_ordinals(end))
+
+    # difference array over the covered week range
+    lo = seg_start.min()
+    diff = np.zeros(seg_end.max() - lo + 2, dtype=np.int64)
+    np.add.at(diff, seg_start - lo, 1)
+    np.add.at(diff, seg_end - lo + 1, -1)
+    counts = np.cumsum(diff[:-1])
+    hit = np.flatnonzero(counts > 0)
+    return pd.DataFrame({
+        "week_start": week_start_from_ordinal(hit + lo),
+        "finals_school_count_week": counts[hit],
+    })
+
+def expand_intervals_daily(df_finals: pd.DataFrame) -> pd.DataFrame:
+    """One (date, school) row per finals day, built with np.repeat instead of a Python loop."""
+    if df_finals.empty:
+        return pd.DataFrame(columns=["date", "school"])
+    start = day_ordinals(df_finals["finals_start"])
+    end   = day_ordinals(df_finals["finals_end"])
+    nat = np.datetime64("NaT").astype(np.int64)
+    ok = (start != nat) & (end != nat) & (end >= start)
+    start, end = start[ok], end[ok]
+    schools = df_finals["school"].to_numpy()[ok]
+    lengths = end - start + 1
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    days = np.repeat(start, lengths) + offsets
+    return pd.DataFrame({
+        "date": days.astype("datetime64[D]"),
+        "school": np.repeat(schools, lengths),
+    })
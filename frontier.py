@@ -0,0 +1,295 @@
+import re, math, codecs, hashlib, heapq, posixpath, threading, urllib.parse, urllib.robotparser
+from typing import Callable, Dict, Iterator, List, Optional, Pattern
+import pandas as pd
+from links import extract_links
+from profiling import PROFILER
+
+# Crawl frontier for discovering .ics feeds across many institutions. Each seed is
+# walked level by level (best calendar-looking links first within a level) up to
+# MAX_DEPTH hops, skipping URLs already seen in that walk (Bloom filter over normalized URLs),
+# anything robots.txt disallows, and hosts that have used up their page/byte budget.
+# robots.txt Crawl-delay / Request-rate is pushed into the shared HostThrottle.
+
+# ------------------- SETTINGS -------------------
+MAX_DEPTH        = 1                  # hops from the seed page (the old start page + subpages walk)
+FANOUT           = 10                 # best-scored subpages followed per page, at most max_links
+DOMAIN_PAGES     = 1 + FANOUT         # HTML pages fetched per host per run
+DOMAIN_BYTES     = 15 * 1024 * 1024   # HTML bytes read per host per run
+MAX_CRAWL_DELAY  = 30.0               # ignore robots.txt delays longer than this (seconds)
+BLOOM_CAPACITY   = 10_000             # URLs per discover() call
+BLOOM_ERROR      = 1e-3
+
+LOOKS_CALENDAR = re.compile(r"(calendar|academic|schedule|dates|exam|final|registrar)", re.I)
+SKIP_EXT = re.compile(r"\.(pdf|docx?|xlsx?|pptx?|zip|jpe?g|png|gif|svg|mp[34]|mov|css|js|xml|json)$", re.I)
+TRACKING_PARAMS = re.compile(r"^(utm_\w+|gclid|fbclid|mc_[ce]id|_ga)$", re.I)
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+# ------------------- URLS -------------------
+def _fix_escapes(s: str) -> str:
+    """Upper-case percent escapes and decode the ones for unreserved characters."""
+    def fix(m):
+        ch = chr(int(m.group(1), 16))
+        return ch if re.match(r"[A-Za-z0-9\-._~]", ch) else "%" + m.group(1).upper()
+    return re.sub(r"%([0-9A-Fa-f]{2})", fix, s)
+
+def normalize_url(url: str) -> str:
+    """Canonical form used for dedup: lower-case scheme/host, no default port, dot
+    segments resolved, sorted query without tracking params, no fragment."""
+    parts = urllib.parse.urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    if parts.port is not None and str(parts.port) != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = _fix_escapes(parts.path) or "/"
+    trailing = path.endswith("/")
+    path = posixpath.normpath(path)
+    if path.startswith("//"):     # normpath keeps a leading double slash
+        path = "/" + path.lstrip("/")
+    if trailing and path != "/":
+        path += "/"
+    query = urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+    query = sorted((k, v) for k, v in query if not TRACKING_PARAMS.match(k))
+    return urllib.parse.urlunsplit((scheme, host, path, urllib.parse.urlencode(query), ""))
+
+def host_of(url: str) -> str:
+    return urllib.parse.urlsplit(url).netloc.lower()
+
+def is_ics(url: str) -> bool:
+    return urllib.parse.urlsplit(url).path.lower().endswith(".ics")
+
+def score(url: str, looks_calendar: Pattern = LOOKS_CALENDAR) -> float:
+    """How promising a same-site page is; 0 means not worth fetching."""
+    path = urllib.parse.urlsplit(url).path
+    if SKIP_EXT.search(path):
+        return 0.0
+    hits = {m.group(0).lower() for m in looks_calendar.finditer(url)}
+    if not hits:
+        return 0.0
+    return len(hits) + 1.0 / (1 + path.count("/"))   # more cues, shallower paths first
+
+# ------------------- VISITED SET -------------------
+class BloomFilter:
+    """Fixed-size set of strings with false positives at about `error_rate`, never false negatives.
+
+    10k entries at 0.1% take ~18 KB, however many links a site's pages carry.
+    A false positive only means a page is skipped.
+    """
+    def __init__(self, capacity: int = BLOOM_CAPACITY, error_rate: float = BLOOM_ERROR):
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _positions(self, key: str) -> List[int]:
+        d = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = int.from_bytes(d[:8], "little"), int.from_bytes(d[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key: str) -> bool:
+        """Insert `key`; returns False if it was (probably) already there."""
+        pos = self._positions(key)
+        with self._lock:
+            if all(self.bits[p >> 3] & (1 << (p & 7)) for p in pos):
+                return False
+            for p in pos:
+                self.bits[p >> 3] |= 1 << (p & 7)
+            self.count += 1
+            return True
+
+# ------------------- ROBOTS.TXT -------------------
+class RobotsCache:
+    """One parsed robots.txt per host, fetched once per run through the HTTP cache.
+
+    Follows urllib.robotparser's conventions: 401/403 disallow everything, other
+    errors allow everything. Crawl-delay (or Request-rate) raises that host's delay
+    on the throttle, capped at MAX_CRAWL_DELAY.
+    """
+    def __init__(self, fetcher, agent: str, throttle=None, max_delay: float = MAX_CRAWL_DELAY):
+        self.fetcher = fetcher
+        self.agent = agent
+        self.throttle = throttle
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._host_locks: Dict[str, threading.Lock] = {}
+        self._parsers: Dict[str, urllib.robotparser.RobotFileParser] = {}
+
+    def _fetch(self, url: str) -> urllib.robotparser.RobotFileParser:
+        parts = urllib.parse.urlsplit(url)
+        robots_url = f"{parts.scheme}://{parts.netloc}/robots.txt"
+        rp = urllib.robotparser.RobotFileParser(robots_url)
+        try:
+            with PROFILER.stage("robots_fetch"):
+                r = self.fetcher.get(robots_url)
+            if r.status_code == 200:
+                rp.parse(r.text.splitlines())
+            elif r.status_code in (401, 403):
+                rp.disallow_all = True
+            else:
+                rp.allow_all = True
+        except Exception as e:
+            print(f"  ! Error fetching {robots_url}: {e}")
+            rp.allow_all = True
+        delay = rp.crawl_delay(self.agent)
+        rate = rp.request_rate(self.agent)
+        if delay is None and rate is not None and rate.requests:
+            delay = rate.seconds / rate.requests
+        if delay and self.throttle is not None:
+            self.throttle.set_delay(parts.netloc.lower(), min(float(delay), self.max_delay))
+        return rp
+
+    def parser(self, url: str) -> urllib.robotparser.RobotFileParser:
+        host = host_of(url)
+        with self._lock:
+            rp = self._parsers.get(host)
+            if rp is not None:
+                return rp
+            lock = self._host_locks.setdefault(host, threading.Lock())
+        with lock:   # one fetch per host even with several workers on it
+            with self._lock:
+                rp = self._parsers.get(host)
+            if rp is None:
+                rp = self._fetch(url)
+                with self._lock:
+                    self._parsers[host] = rp
+            return rp
+
+    def allowed(self, url: str) -> bool:
+        return self.parser(url).can_fetch(self.agent, url)
+
+# ------------------- BUDGETS -------------------
+class DomainBudget:
+    """Per-host caps on pages fetched and bytes read during one run."""
+    def __init__(self, max_pages: int = DOMAIN_PAGES, max_bytes: int = DOMAIN_BYTES):
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.pages: Dict[str, int] = {}
+        self.bytes: Dict[str, int] = {}
+
+    def take_page(self, host: str) -> bool:
+        with self._lock:
+            if self.pages.get(host, 0) >= self.max_pages or self.bytes.get(host, 0) >= self.max_bytes:
+                return False
+            self.pages[host] = self.pages.get(host, 0) + 1
+            return True
+
+    def add_bytes(self, host: str, n: int) -> bool:
+        """Charge `n` bytes; False once the host is over its byte budget."""
+        with self._lock:
+            self.bytes[host] = self.bytes.get(host, 0) + n
+            return self.bytes[host] < self.max_bytes
+
+# ------------------- FRONTIER -------------------
+class Frontier:
+    """Shared by all crawl workers of a run; discover() is called once per seed."""
+    def __init__(self, fetcher, agent: str, throttle=None, looks_calendar: Pattern = LOOKS_CALENDAR,
+                 max_depth: int = MAX_DEPTH, fanout: int = FANOUT,
+                 budget: Optional[DomainBudget] = None, robots: Optional[RobotsCache] = None,
+                 visited_capacity: int = BLOOM_CAPACITY):
+        self.fetcher = fetcher
+        self.looks_calendar = looks_calendar
+        self.max_depth = max_depth
+        self.fanout = fanout
+        self.budget = budget or DomainBudget()
+        self.robots = robots or RobotsCache(fetcher, agent, throttle)
+        self.visited_capacity = visited_capacity
+
+    def _text(self, r, host: str) -> Iterator[str]:
+        """Decoded page chunks, cut off once the host's byte budget runs out."""
+        dec = codecs.getincrementaldecoder(r.encoding or "utf-8")(errors="replace")
+        for chunk in r.iter_content():
+            yield dec.decode(chunk)
+            if not self.budget.add_bytes(host, len(chunk)):
+                print(f"  ! Byte budget used up for {host}")
+                return
+        yield dec.decode(b"", final=True)
+
+    def page_links(self, url: str, stop: Optional[Callable[[str], bool]] = None) -> Optional[List[str]]:
+        try:
+            r = self.fetcher.get(url, stream=True)
+            if r.status_code != 200:
+                print(f"  ! HTTP {r.status_code} for {url}")
+                return None
+            with PROFILER.stage("link_extract"):
+                return extract_links(self._text(r, host_of(url)), url, stop)
+        except Exception as e:
+            print(f"  ! Error fetching {url}: {e}")
+            return None
+
+    def discover(self, start_url: str, max_links: int = 8) -> List[str]:
+        """Same-site .ics links reachable from `start_url`, shallowest level that has any.
+
+        The visited set belongs to this call, so discovering the same seed again walks
+        the same pages; at most min(fanout, max_links) subpages are followed per page.
+        """
+        start = normalize_url(start_url)
+        site = host_of(start)
+        visited = BloomFilter(self.visited_capacity)
+        visited.add(start)
+        fanout = min(self.fanout, max_links)
+        queue = [(0, 0.0, 0, start)]   # (depth, -score, tie-break, url)
+        found: Dict[str, None] = {}
+        found_depth = None
+        tick = 0
+
+        def enough(u: str) -> bool:
+            if is_ics(u) and host_of(u) == site:
+                found.setdefault(normalize_url(u))
+            return len(found) >= max_links
+
+        while queue and len(found) < max_links:
+            depth, _, _, url = heapq.heappop(queue)
+            if found_depth is not None and depth > found_depth:
+                break                   # feeds found one level up; don't go deeper
+            if not self.robots.allowed(url):
+                print(f"  (robots.txt disallows {url})")
+                continue
+            if not self.budget.take_page(site):
+                print(f"  ! Page budget used up for {site}")
+                break
+            links = self.page_links(url, enough)
+            if links is None:
+                continue
+            if found and found_depth is None:
+                found_depth = depth
+            if depth >= self.max_depth:
+                continue
+            children = {}
+            for link in links:
+                n = normalize_url(link)
+                if host_of(n) != site or is_ics(n) or n in children:
+                    continue
+                s = score(n, self.looks_calendar)
+                if s > 0:
+                    children[n] = s
+            for n, s in sorted(children.items(), key=lambda kv: -kv[1])[:fanout]:
+                if visited.add(n):
+                    tick += 1
+                    heapq.heappush(queue, (depth + 1, -s, tick, n))
+
+        return [u for u in found if self.robots.allowed(u)][:max_links]
+
+# ------------------- SEEDS -------------------
+def load_seeds(path: str, school_col: str = "school", url_col: str = "start") -> List[Dict]:
+    """Seed list from a CSV (e.g. an IPEDS export with school_col="INSTNM", url_col="WEBADDR").
+
+    Bare hosts like "www.bu.edu/" get https://; rows without a URL are dropped and
+    repeated start pages are kept once.
+    """
+    df = pd.read_csv(path, usecols=[school_col, url_col], dtype=str).dropna()
+    seeds, seen = [], set()
+    for school, url in zip(df[school_col].str.strip(), df[url_col].str.strip()):
+        if not url:
+            continue
+        if "://" not in url:
+            url = "https://" + url
+        key = normalize_url(url)
+        if key in seen:
+            continue
+        seen.add(key)
+        seeds.append({"school": school, "start": url})
+    return seeds
@@ -0,0 +1,344 @@
+import os, json, time, codecs, hashlib, threading
+from typing import Callable, Dict, Iterator, Optional
+from profiling import PROFILER
+
+# ------------------- SETTINGS -------------------
+FRESH_FOR = 60 * 60               # serve straight from disk, no request at all
+TTL       = 30 * 24 * 60 * 60     # drop entries not revalidated for this long
+MAX_BYTES = 200 * 1024 * 1024     # on-disk cache cap (bodies), oldest-used evicted first
+CHUNK     = 64 * 1024
+
+class CachedResponse:
+    """Minimal stand-in for requests.Response (status_code / content / text).
+
+    Streamed responses carry a chunk source instead of a body; iterate them with
+    iter_content() / iter_text() to keep memory flat, or touch .content to read it all.
+    """
+    def __init__(self, status_code: int, content: bytes = b"", encoding: Optional[str] = None,
+                 from_cache: bool = False, chunks: Optional[Callable[[int], Iterator[bytes]]] = None,
+                 sha256: Optional[str] = None):
+        self.status_code = status_code
+        self.sha256 = sha256        # body digest, known up front for cache-backed responses
+        self._content = content
+        self._chunks = chunks
+        self.encoding = encoding
+        self.from_cache = from_cache
+
+    def iter_content(self, chunk_size: int = CHUNK) -> Iterator[bytes]:
+        if self._chunks is None:
+            for i in range(0, len(self._content), chunk_size):
+                yield self._content[i:i + chunk_size]
+        else:
+            yield from self._chunks(chunk_size)
+
+    def iter_text(self, chunk_size: int = CHUNK) -> Iterator[str]:
+        dec = codecs.getincrementaldecoder(self.encoding or "utf-8")(errors="replace")
+        for chunk in self.iter_content(chunk_size):
+            yield dec.decode(chunk)
+        yield dec.decode(b"", final=True)
+
+    @property
+    def content(self) -> bytes:
+        if self._chunks is not None:
+            self._content, self._chunks = b"".join(self.iter_content()), None
+        return self._content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+class CachedFetcher:
+    """Connection-pooled GETs with an on-disk, URL-keyed conditional-GET cache.
+
+    Cached entries newer than `fresh_for` are returned without touching the network.
+    Older ones are revalidated with If-None-Match / If-Modified-Since, and a 304 reuses
+    the stored body. Entries idle for longer than `ttl` or past `max_bytes` are evicted.
+    A streamed body the reader stops early is cached as a truncated prefix and revalidated
+    like any other entry; reading past the prefix re-downloads the page.
+    requests is imported and the cache directory created on first use, not at construction.
+    """
+    def __init__(self, cache_dir: str, headers: Optional[Dict] = None, timeout: float = 25,
+                 pool_size: int = 8, throttle=None, fresh_for: float = FRESH_FOR,
+                 ttl: float = TTL, max_bytes: int = MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.throttle = throttle
+        self.fresh_for = fresh_for
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.headers = headers
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._session = None
+        self._sizes: Optional[Dict[str, int]] = None   # url -> body bytes, from the first evict() scan on
+        self._total = 0
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                if self.headers:
+                    session.headers.update(self.headers)
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+
+    # ---- disk layout: <sha256(url)>.json (validators) + <sha256(url)>.body ----
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + ".json", base + ".body"
+
+    def _load(self, url: str) -> Optional[Dict]:
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if not os.path.exists(body_path) or meta.get("url") != url:
+                return None
+            if time.time() - meta["validated_at"] > self.ttl:
+                self._drop(url)
+                return None
+            return meta
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_meta(self, meta_path: str, meta: Dict):
+        tmp = f"{meta_path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)
+
+    def _store(self, url: str, r, encoding: Optional[str], size: int, sha256: Optional[str],
+               truncated: bool = False):
+        """Record validators for a body already written to the .body path."""
+        self._write_meta(self._paths(url)[0], {
+            "url": url,
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+            "encoding": encoding,
+            "size": size,
+            "sha256": None if truncated else sha256,
+            "truncated": truncated,
+            "validated_at": time.time(),
+        })
+        # running total: the cache directory is only rescanned once, then when over max_bytes
+        with self._lock:
+            known = self._sizes is not None
+            if known:
+                self._total += size - self._sizes.get(url, 0)
+                self._sizes[url] = size
+        if not known or self._total > self.max_bytes:
+            self.evict()
+
+    def _write_body(self, url: str, chunks: Iterator[bytes], digest,
+                    partial: Optional[Dict] = None) -> Iterator[bytes]:
+        """Spool chunks to the cache while passing them through; commit only if fully read,
+        or, given a `partial` dict, also a prefix the reader stopped at (partial["size"] > 0)."""
+        body_path = self._paths(url)[1]
+        tmp = f"{body_path}.{threading.get_ident()}.tmp"
+        os.makedirs(self.cache_dir, exist_ok=True)
+        done = False
+        try:
+            with open(tmp, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    digest.update(chunk)
+                    if partial is not None:
+                        partial["size"] += len(chunk)
+                    yield chunk
+            done = True
+        finally:
+            if done or (partial is not None and partial["size"]):
+                os.replace(tmp, body_path)
+                if partial is not None:
+                    partial["done"] = done
+            elif os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _file_chunks(self, url: str) -> Callable[[int], Iterator[bytes]]:
+        body_path = self._paths(url)[1]
+        def chunks(chunk_size: int) -> Iterator[bytes]:
+            with open(body_path, "rb") as f:
+                while True:
+                    block = f.read(chunk_size)
+                    if not block:
+                        break
+                    yield block
+        return chunks
+
+    def _resume_chunks(self, url: str) -> Callable[[int], Iterator[bytes]]:
+        """A truncated entry's cached prefix, then - only if the reader wants more than an
+        earlier run read - the rest of a fresh full download (which replaces the entry)."""
+        cached = self._file_chunks(url)
+        def chunks(chunk_size: int) -> Iterator[bytes]:
+            sent = 0
+            for block in cached(chunk_size):
+                sent += len(block)
+                yield block
+            r = self._request(url, {}, stream=True)
+            if r.status_code != 200:
+                r.close()
+                return
+            for chunk in self._spool(url, r, r.encoding or "utf-8", 0.0)(chunk_size):
+                if sent >= len(chunk):
+                    sent -= len(chunk)
+                    continue
+                yield chunk[sent:]
+                sent = 0
+        return chunks
+
+    def _spool(self, url: str, r, encoding: str, waited: float) -> Callable[[int], Iterator[bytes]]:
+        """Chunks of a streamed 200, written to the cache as they pass. A reader that stops
+        early (link scan done, byte budget spent) still leaves the prefix it read cached,
+        validators and all, marked truncated."""
+        def chunks(chunk_size: int) -> Iterator[bytes]:
+            nonlocal waited
+            digest, partial = hashlib.sha256(), {"size": 0, "done": False}
+            body = self._write_body(url, r.iter_content(chunk_size), digest, partial)
+            try:
+                with r:
+                    while True:
+                        t = time.perf_counter()      # only time spent reading, not the consumer's
+                        chunk = next(body, None)
+                        waited += time.perf_counter() - t
+                        if chunk is None:
+                            break
+                        yield chunk
+            finally:
+                body.close()
+                if partial["size"] or partial["done"]:
+                    PROFILER.record_url(url, waited, partial["size"], "network", 200)
+                    self._store(url, r, encoding, partial["size"], digest.hexdigest(),
+                                truncated=not partial["done"])
+        return chunks
+
+    def _read_body(self, url: str) -> Optional[bytes]:
+        try:
+            with open(self._paths(url)[1], "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _drop(self, url: str):
+        if self._sizes is not None:
+            self._total -= self._sizes.pop(url, 0)
+        for p in self._paths(url):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+
+    def evict(self):
+        """Remove expired entries, then the least recently validated ones until under max_bytes."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        with self._lock:
+            entries = []
+            now = time.time()
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".json"):
+                    continue
+                meta_path = os.path.join(self.cache_dir, name)
+                try:
+                    with open(meta_path, "r", encoding="utf-8") as f:
+                        meta = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if now - meta.get("validated_at", 0) > self.ttl:
+                    self._drop(meta["url"])
+                    continue
+                entries.append(meta)
+            self._sizes = {m["url"]: m.get("size", 0) for m in entries}
+            self._total = sum(self._sizes.values())
+            for meta in sorted(entries, key=lambda m: m.get("validated_at", 0)):
+                if self._total <= self.max_bytes:
+                    break
+                self._drop(meta["url"])
+
+    def get(self, url: str, stream: bool = False) -> CachedResponse:
+        """GET through the cache. With stream=True bodies are never held in memory whole."""
+        t0 = time.perf_counter()
+        meta = self._load(url)
+        if meta and meta.get("truncated") and not stream:
+            meta = None                  # a cached prefix can't stand in for a whole body
+        if meta and time.time() - meta["validated_at"] < self.fresh_for:
+            hit = self._cached(url, meta, stream)
+            if hit is not None:
+                PROFILER.record_url(url, time.perf_counter() - t0, meta.get("size", 0), "cache", 200)
+                return hit
+
+        cond = {}
+        if meta:
+            if meta.get("etag"):
+                cond["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                cond["If-Modified-Since"] = meta["last_modified"]
+
+        t0 = time.perf_counter()
+        r = self._request(url, cond, stream)
+
+        if r.status_code == 304 and meta:
+            r.close()
+            meta["validated_at"] = time.time()
+            hit = self._cached(url, meta, stream)
+            if hit is not None:
+                self._write_meta(self._paths(url)[0], meta)
+                PROFILER.record_url(url, time.perf_counter() - t0, meta.get("size", 0), "cache", 304)
+                return hit
+            # body vanished under us (evicted) -> fetch unconditionally
+            r = self._request(url, {}, stream)
+
+        if r.status_code != 200:
+            r.close()
+            PROFILER.record_url(url, time.perf_counter() - t0, 0, "network", r.status_code)
+            return CachedResponse(r.status_code)
+        if not stream:
+            encoding = r.encoding or r.apparent_encoding
+            digest = hashlib.sha256()
+            list(self._write_body(url, iter([r.content]), digest))
+            PROFILER.record_url(url, time.perf_counter() - t0, len(r.content), "network", 200)
+            self._store(url, r, encoding, len(r.content), digest.hexdigest())
+            return CachedResponse(200, r.content, encoding, sha256=digest.hexdigest())
+
+        encoding = r.encoding or "utf-8"
+        waited = time.perf_counter() - t0     # time to headers
+        return CachedResponse(200, encoding=encoding, chunks=self._spool(url, r, encoding, waited))
+
+    def _request(self, url: str, headers: Dict, stream: bool):
+        if self.throttle is not None:
+            self.throttle.wait(url)
+        return self.session.get(url, headers=headers, timeout=self.timeout, stream=stream)
+
+    def fetch_to_cache(self, url: str) -> CachedResponse:
+        """Like get(stream=True), but the body is on disk and its sha256 known before reading.
+
+        Lets callers compare a feed's digest against a previous run and skip parsing it.
+        """
+        r = self.get(url, stream=True)
+        if r.status_code != 200 or (r.from_cache and r.sha256):
+            return r              # (a truncated entry has no digest: read it through below)
+        for _ in r.iter_content():
+            pass
+        meta = self._load(url)
+        if meta is None:   # evicted straight away (body larger than max_bytes)
+            return self.get(url, stream=True)
+        return self._cached(url, meta, stream=True)
+
+    def _cached(self, url: str, meta: Dict, stream: bool) -> Optional[CachedResponse]:
+        if stream:
+            if not os.path.exists(self._paths(url)[1]):
+                return None
+            chunks = self._resume_chunks(url) if meta.get("truncated") else self._file_chunks(url)
+            return CachedResponse(200, encoding=meta.get("encoding"), from_cache=True,
+                                  chunks=chunks, sha256=meta.get("sha256"))
+        body = self._read_body(url)
+        if body is None:
+            return None
+        return CachedResponse(200, body, meta.get("encoding"), from_cache=True,
+                              sha256=meta.get("sha256"))
@@ -0,0 +1,118 @@
+import re
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, Optional, Pattern, Tuple
+from event_store import EventBuilder, EventStore, SCHOOL_IDS, SOURCE_IDS
+
+# Streaming VEVENT tokenizer. Reads an .ics feed line by line (unfolding as it goes),
+# keeps only the few properties we need for the event currently open, and reduces a
+# keyword-matching event to a 17-byte event_store record as soon as END:VEVENT is seen;
+# other events are dropped there. The year window and dedup then run once over the feed.
+
+KEEP = {"DTSTART", "DTEND", "DURATION", "SUMMARY", "DESCRIPTION"}
+DURATION_RE = re.compile(
+    r"^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$"
+)
+
+def unfold(lines: Iterable[str]) -> Iterator[str]:
+    """Join RFC 5545 folded lines (continuations start with a space or tab)."""
+    cur = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and cur is not None:
+            cur += line[1:]
+            continue
+        if cur is not None:
+            yield cur
+        cur = line
+    if cur:
+        yield cur
+
+def iter_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """Split an iterable of decoded text chunks into lines without joining the whole body."""
+    tail = ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        parts = (tail + chunk).splitlines(keepends=True)
+        # a trailing bare "\r" may be the first half of a "\r\n" split across chunks
+        tail = parts.pop() if parts and not parts[-1].endswith("\n") else ""
+        yield from parts
+    if tail:
+        yield tail
+
+def split_prop(line: str) -> Tuple[str, Dict[str, str], str]:
+    """'DTSTART;VALUE=DATE:20240510' -> ('DTSTART', {'VALUE': 'DATE'}, '20240510')."""
+    head, _, value = line.partition(":")
+    name, *params = head.split(";")
+    return name.upper(), dict(p.partition("=")[::2] for p in params), value
+
+def unescape(text: str) -> str:
+    return (text.replace("\\N", "\n").replace("\\n", "\n")
+                .replace("\\,", ",").replace("\\;", ";").replace("\\\\", "\\"))
+
+def parse_dt(value: str) -> Tuple[datetime, bool]:
+    """Return (naive datetime, all_day). The date part is the event's own calendar date."""
+    value = value.strip()
+    if "T" not in value:
+        return datetime.strptime(value[:8], "%Y%m%d"), True
+    return datetime.strptime(value[:15], "%Y%m%dT%H%M%S"), False
+
+def parse_duration(value: str) -> Optional[timedelta]:
+    m = DURATION_RE.match(value.strip())
+    if not m:
+        return None
+    sign, w, d, h, mi, s = m.groups()
+    td = timedelta(weeks=int(w or 0), days=int(d or 0), hours=int(h or 0),
+                   minutes=int(mi or 0), seconds=int(s or 0))
+    return -td if sign == "-" else td
+
+def event_dates(props: Dict[str, str]) -> Optional[Tuple[date, date]]:
+    """(start, inclusive end) the same way parse_ics() derives them from ics.Event."""
+    if "DTSTART" not in props:
+        return None
+    begin, all_day = parse_dt(props["DTSTART"])
+    if "DTEND" in props:
+        end = parse_dt(props["DTEND"])[0]
+    elif "DURATION" in props and parse_duration(props["DURATION"]) is not None:
+        end = begin + parse_duration(props["DURATION"])
+    else:
+        end = begin + timedelta(days=1) if all_day else begin
+    return begin.date(), end.date() - timedelta(days=1)
+
+def stream_events(lines: Iterable[str], source_url: str, keys: Pattern, school: str = "") -> EventStore:
+    """The VEVENTs of a raw .ics feed whose title or description matches `keys`, as store records."""
+    out = EventBuilder()
+    school_id, source_id = SCHOOL_IDS.id(school), SOURCE_IDS.id(source_url)
+    depth = 0          # nesting below the open VEVENT (VALARM etc.)
+    props = None
+    for line in unfold(lines):
+        if line.startswith("BEGIN:"):
+            if props is not None:
+                depth += 1
+            elif line[6:].strip().upper() == "VEVENT":
+                props = {}
+            continue
+        if line.startswith("END:"):
+            if props is None:
+                continue
+            if depth:
+                depth -= 1
+                continue
+            ev, props = props, None
+            title = unescape(ev.get("SUMMARY", "")).strip()
+            desc  = unescape(ev.get("DESCRIPTION", "")).strip()
+            if not keys.search(f"{title} {desc}"):
+                continue
+            try:
+                dates = event_dates(ev)
+            except ValueError:
+                dates = None
+            if dates:
+                out.add(school_id, source_id, dates[0], dates[1], True)
+            continue
+        if props is None or depth:
+            continue
+        name, _, value = split_prop(line)
+        if name in KEEP:
+            props[name] = value
+    return out.build()
@@ -0,0 +1,188 @@
+import os, json, time, hashlib
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import pandas as pd
+
+# ------------------- SETTINGS -------------------
+MANIFEST_VERSION = 1
+REDISCOVER_AFTER = 7 * 24 * 60 * 60     # re-walk a school's pages for new .ics links after this
+FINALS_COLUMNS = ["school","term","year","finals_start","finals_end","source_url"]
+
+# Manifest layout (JSON):
+# {"version": 1, "csv_sha256": hex of the finals CSV as the last incremental run wrote it,
+#  "schools": {school: {"start": url, "discovered_at": ts, "ics": [feed urls],
+#                       "feeds": {feed url: {"sha256": hex, "params": hex, "checked_at": ts,
+#                                            "rows": [{"start": iso, "end": iso}]}}}}}
+# "params" fingerprints the extraction settings (year window, keyword regex), so an
+# unchanged feed is still re-parsed when they change, e.g. MAX_YEAR on January 1st.
+
+def extraction_params(*settings) -> str:
+    """Fingerprint of the settings extract() depends on (patterns by their source + flags)."""
+    parts = [f"{s.pattern}/{s.flags}" if hasattr(s, "pattern") else repr(s) for s in settings]
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+def load_manifest(path: str) -> Dict:
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == MANIFEST_VERSION:
+                return manifest
+            print(f"  ! Ignoring manifest with unknown version → {path}")
+        except (OSError, ValueError) as e:
+            print(f"  ! Could not read manifest {path}: {e}")
+    return {"version": MANIFEST_VERSION, "schools": {}}
+
+def save_manifest(path: str, manifest: Dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+def refresh_school(item: Dict, old: Optional[Dict], discover: Callable[[str], List[str]],
+                   fetcher, extract: Callable[[str, object], List[Dict]],
+                   rediscover_after: float = REDISCOVER_AFTER,
+                   params: str = "") -> Tuple[Dict, Dict[str, Optional[List[Dict]]]]:
+    """Bring one school's manifest entry up to date.
+
+    Returns (new entry, changes) where changes maps feed url -> fresh finals rows, or
+    None for feeds that are no longer linked. Feeds whose body hash and extraction
+    params match the manifest are not parsed at all; feeds that fail to download keep
+    their old rows. A rediscovery that fails or finds nothing keeps the old feed list.
+    """
+    school, start = item["school"], item["start"]
+    now = time.time()
+    old = old if old and old.get("start") == start else {}
+    old_feeds = old.get("feeds", {})
+
+    ics_links, discovered_at = old.get("ics", []), old.get("discovered_at", 0)
+    if not ics_links or now - discovered_at >= rediscover_after:
+        try:
+            found = discover(start)
+        except Exception as e:
+            print(f"    [{school}] ! Error discovering feeds on {start}: {e}")
+            found = []
+        if found:
+            ics_links, discovered_at = found, now
+        elif ics_links:
+            print(f"    [{school}] ! No feeds found on {start}; keeping the {len(ics_links)} known feed(s)")
+
+    feeds, changes = {}, {}
+    for url in ics_links:
+        prev = old_feeds.get(url)
+        try:
+            r = fetcher.fetch_to_cache(url)
+        except Exception as e:
+            print(f"    [{school}] ! Error fetching ICS {url}: {e}")
+            r = None
+        if r is None or r.status_code != 200:
+            if r is not None:
+                print(f"    [{school}] ! HTTP {r.status_code} for ICS {url}")
+            if prev:
+                feeds[url] = prev
+            continue
+        if prev and r.sha256 and prev.get("sha256") == r.sha256 and prev.get("params", "") == params:
+            feeds[url] = dict(prev, checked_at=now)
+            continue
+        try:
+            rows = [{"start": w["start"].isoformat(), "end": w["end"].isoformat()} for w in extract(url, r)]
+        except Exception as e:
+            print(f"    [{school}] ! Error parsing ICS {url}: {e}")
+            if prev:
+                feeds[url] = prev
+            continue
+        print(f"  [{school}] ICS changed: {url} ({len(rows)} finals rows)")
+        feeds[url] = {"sha256": r.sha256, "params": params, "checked_at": now, "rows": rows}
+        changes[url] = rows
+
+    for url in old_feeds:
+        if url not in feeds:
+            changes[url] = None
+    entry = {"start": start, "discovered_at": discovered_at, "ics": ics_links, "feeds": feeds}
+    return entry, changes
+
+def file_digest(path: str) -> Optional[str]:
+    if not os.path.exists(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def school_rows(school: str, entry: Dict, guess_term: Callable[[int], str]) -> List[Dict]:
+    """Finals CSV rows for every feed of a manifest entry, in feed order."""
+    out = []
+    for url, feed in entry.get("feeds", {}).items():
+        for w in feed.get("rows", []):
+            start = pd.Timestamp(w["start"])
+            out.append({
+                "school": school,
+                "term": guess_term(start.month),
+                "year": str(start.year),
+                "finals_start": w["start"],
+                "finals_end": w["end"],
+                "source_url": url
+            })
+    return out
+
+def patch_finals_csv(csv_path: str, schools: Dict[str, Dict], rebuild: Iterable[str],
+                     guess_term: Callable[[int], str]) -> pd.DataFrame:
+    """Re-derive the rows of the `rebuild` schools from all of their manifest feeds
+    (`schools` is manifest["schools"]); every other school's rows stay as they are.
+
+    A school's rows are rebuilt as a whole because the dedup on (school, start, end)
+    keeps one feed's copy of a shared window: dropping only a changed feed's rows
+    would lose windows another feed still lists.
+    """
+    if os.path.exists(csv_path):
+        df = pd.read_csv(csv_path, dtype=str)
+        df = df[[c for c in FINALS_COLUMNS if c in df.columns]]
+    else:
+        df = pd.DataFrame(columns=FINALS_COLUMNS)
+    rebuild = set(rebuild)
+    if not rebuild:
+        return df
+
+    df = df[~df["school"].isin(rebuild)]
+    add = [row for school in sorted(rebuild) if school in schools
+           for row in school_rows(school, schools[school], guess_term)]
+    if add:
+        df = pd.concat([df, pd.DataFrame(add, columns=FINALS_COLUMNS)], ignore_index=True)
+    df = df.drop_duplicates(subset=["school","finals_start","finals_end"])
+    df = df.sort_values(["school","year","finals_start"],
+                        key=lambda c: pd.to_numeric(c, errors="coerce") if c.name == "year" else c)
+    df.to_csv(csv_path, index=False)
+    return df
+
+def incremental_update(schools: List[Dict], csv_path: str, manifest_path: str,
+                       discover: Callable[[str], List[str]], fetcher,
+                       extract: Callable[[str, object], List[Dict]], guess_term: Callable[[int], str],
+                       crawl: Callable, params: str = "") -> pd.DataFrame:
+    """Refresh every school against the manifest, then patch the finals CSV in place.
+
+    `params` is extraction_params() of the settings `extract` uses. When the CSV is not
+    the one the last incremental run wrote (e.g. a full scrape rewrote it), the rows of
+    every school in the manifest are regenerated from the stored feed rows.
+    """
+    manifest = load_manifest(manifest_path)
+    old = manifest["schools"]
+    digest = file_digest(csv_path)
+    csv_matches = digest is not None and manifest.get("csv_sha256") == digest
+    results = crawl(schools, lambda item: refresh_school(item, old.get(item["school"]), discover, fetcher,
+                                                        extract, params=params))
+
+    changes = {}
+    for item, (entry, school_changes) in zip(schools, results):
+        manifest["schools"][item["school"]] = entry
+        if school_changes:
+            changes[item["school"]] = school_changes
+    rebuild = set(changes)
+    if not csv_matches and old:
+        print(f"  ! {csv_path} changed outside --incremental; regenerating its manifest schools")
+        rebuild |= set(old)
+    df = patch_finals_csv(csv_path, manifest["schools"], rebuild, guess_term)
+    manifest["csv_sha256"] = file_digest(csv_path)
+    save_manifest(manifest_path, manifest)
+    n = sum(len(v) for v in changes.values())
+    print(f"\nIncremental refresh: {n} changed feed(s) across {len(changes)} school(s) → {csv_path} (rows={len(df)})")
+    return df
@@ -0,0 +1,43 @@
+import urllib.parse
+from html.parser import HTMLParser
+from typing import Callable, Iterable, Iterator, List, Optional
+
+# Incremental <a href> extraction. html.parser is fed the page chunk by chunk as it
+# downloads and hrefs are handed out as soon as their tag closes, so nothing like a
+# DOM is built and callers can stop reading a page once they have what they need.
+# Matches BeautifulSoup's find_all("a", href=True) + a["href"].strip() + urljoin().
+
+class HrefParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.hrefs: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "a":
+            return
+        for name, value in attrs:
+            if name == "href":
+                self.hrefs.append(value or "")   # valueless href -> "" like bs4
+                return
+
+def iter_hrefs(chunks: Iterable[str]) -> Iterator[str]:
+    """Raw href values of <a> tags, in document order, as the text is fed in."""
+    parser = HrefParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.hrefs:
+            yield from parser.hrefs
+            parser.hrefs.clear()
+    parser.close()
+    yield from parser.hrefs
+
+def extract_links(chunks: Iterable[str], base_url: str,
+                  stop: Optional[Callable[[str], bool]] = None) -> List[str]:
+    """Resolved links on a page; if stop(link) returns True, parsing ends right after it."""
+    out = []
+    for href in iter_hrefs(chunks):
+        link = urllib.parse.urljoin(base_url, href.strip())
+        out.append(link)
+        if stop is not None and stop(link):
+            break
+    return out
@@ -0,0 +1,96 @@
+import os, sys, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from typing import Dict, List, Optional
+import pandas as pd
+from scrape_finals import (DATA_OUT, FINALS_CSV, TIMEFRAME, TRENDS, align_trends_to_week,
+                           finals_weekly_intensity, merge_weekly, add_features)
+from storage import FORMATS, load_table, read_columnar, write_columnar
+
+# Panel mode: geos x keywords x school sets. Trends are pulled once per geo in the
+# parent (batched + cached, so the rate limit is respected); each cell's weekly
+# alignment, finals merge and add_features() then run on a process pool and every
+# cell writes its own hive-style partition of the long-format panel:
+#   data_derived/panel/geo=US-MA/keyword=pizza_near_me/school_set=all/part.csv
+
+# ------------------- SETTINGS -------------------
+PANEL_GEOS     = ["US-MA"]
+PANEL_KEYWORDS = ["pizza near me", "coffee near me"]
+# name -> list of school names in the finals CSV (None = every school)
+SCHOOL_SETS: Dict[str, Optional[List[str]]] = {"all": None}
+PANEL_DIR = os.path.join(DATA_OUT, "panel")
+PROCESSES = os.cpu_count() or 2
+
+def partition_dir(out_dir: str, geo: str, keyword: str, school_set: str) -> str:
+    return os.path.join(out_dir, f"geo={geo}", f"keyword={keyword.replace(' ', '_')}",
+                        f"school_set={school_set}")
+
+def build_cell(geo: str, keyword: str, school_set: str, trends: pd.DataFrame,
+               finals_weekly: pd.DataFrame, out_dir: str, columnar: Optional[str] = None) -> Dict:
+    """Align one (geo, keyword, school set) cell and write its partition. Runs in a worker."""
+    t0 = time.perf_counter()
+    col = keyword.replace(" ", "_")
+    trends_weekly = align_trends_to_week(trends[["date", col]])
+    merged = merge_weekly(trends_weekly, finals_weekly)
+    feats = add_features(merged, value_cols=[col])
+    df = feats.rename(columns={col: "value", f"{col}_ma4": "value_ma4"})
+    df.insert(0, "school_set", school_set)
+    df.insert(0, "keyword", col)
+    df.insert(0, "geo", geo)
+
+    part = partition_dir(out_dir, geo, keyword, school_set)
+    os.makedirs(part, exist_ok=True)
+    if columnar:
+        path = write_columnar(df, os.path.join(part, "part" + FORMATS[columnar]), "panel")
+    else:
+        path = os.path.join(part, "part.csv")
+        df.to_csv(path, index=False)
+    return {"geo": geo, "keyword": col, "school_set": school_set, "rows": len(df),
+            "path": path, "seconds": round(time.perf_counter() - t0, 3)}
+
+def run_panel(geos: List[str] = PANEL_GEOS, keywords: List[str] = PANEL_KEYWORDS,
+              school_sets: Dict[str, Optional[List[str]]] = SCHOOL_SETS,
+              finals_csv: str = FINALS_CSV, out_dir: str = PANEL_DIR,
+              processes: int = PROCESSES, columnar: Optional[str] = None,
+              timeframe: str = TIMEFRAME) -> pd.DataFrame:
+    """Build every cell of the panel in parallel; returns one summary row per cell."""
+    finals = load_table(finals_csv, "finals")
+    weekly_by_set = {}
+    for name, schools in school_sets.items():
+        subset = finals if schools is None else finals[finals["school"].isin(schools)]
+        weekly_by_set[name] = finals_weekly_intensity(subset)
+
+    start, end = (date.fromisoformat(t) for t in timeframe.split())
+    print(f"Pulling Trends for {len(geos)} geo(s) × {len(keywords)} keyword(s)…")
+    trends_by_geo = {geo: TRENDS.fetch(keywords, geo, start, end) for geo in geos}
+
+    cells = [(g, k, s) for g in geos for k in keywords for s in school_sets]
+    print(f"Building {len(cells)} panel cells on {processes} process(es)…")
+    done = []
+    with ProcessPoolExecutor(max_workers=max(1, processes)) as pool:
+        futures = [pool.submit(build_cell, g, k, s, trends_by_geo[g], weekly_by_set[s], out_dir, columnar)
+                   for g, k, s in cells]
+        for fut in as_completed(futures):
+            r = fut.result()
+            print(f"  {r['geo']} / {r['keyword']} / {r['school_set']}: rows={r['rows']} ({r['seconds']}s)")
+            done.append(r)
+    summary = pd.DataFrame(done).sort_values(["geo", "keyword", "school_set"]).reset_index(drop=True)
+    print(f"\n✅ Panel written → {out_dir} ({len(summary)} partitions, rows={summary['rows'].sum()})")
+    return summary
+
+def load_panel(out_dir: str = PANEL_DIR, **filters) -> pd.DataFrame:
+    """Read back partitions, optionally only those matching e.g. geo="US-MA", keyword="pizza_near_me"."""
+    parts = []
+    for root, _, files in os.walk(out_dir):
+        keys = dict(p.split("=", 1) for p in os.path.relpath(root, out_dir).split(os.sep) if "=" in p)
+        if any(keys.get(k) != v for k, v in filters.items()):
+            continue
+        for f in files:
+            if f.startswith("part."):
+                path = os.path.join(root, f)
+                parts.append(pd.read_csv(path) if f.endswith(".csv") else read_columnar(path))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+if __name__ == "__main__":
+    fmt = next((a.split("=", 1)[1] for a in sys.argv if a.startswith("--columnar=")), None)
+    run_panel(columnar=fmt)
@@ -0,0 +1,133 @@
+import os, sys, json, time, threading, functools
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# Opt-in instrumentation for the pipeline (--profile). Off by default: every hook
+# checks PROFILER.enabled first, so the unprofiled scripts pay one attribute lookup.
+# Stage times are summed across threads, so concurrent stages (crawl workers) can
+# add up to more than the run's wall time.
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:   # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+def _size(result) -> Optional[int]:
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.stages: Dict[str, Dict] = {}
+        self.urls: List[Dict] = []
+        self.bytes = {"network": 0, "cache": 0}
+
+    def enable(self):
+        self.reset()
+        self.enabled = True
+
+    # ---- recording ----
+    def add_stage(self, name: str, seconds: float, rows: Optional[int] = None):
+        rss = peak_rss_mb()
+        with self._lock:
+            st = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0,
+                                               "rows": 0, "peak_rss_mb": None})
+            st["calls"] += 1
+            st["seconds"] += seconds
+            st["max_seconds"] = max(st["max_seconds"], seconds)
+            if rows is not None:
+                st["rows"] += rows
+            st["peak_rss_mb"] = rss
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - t0)
+
+    def record_url(self, url: str, seconds: float, nbytes: int, source: str, status: int):
+        """source is "network" or "cache" (fresh hit or 304 revalidation)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.urls.append({"url": url, "seconds": round(seconds, 4), "bytes": nbytes,
+                              "source": source, "status": status})
+            self.bytes[source] = self.bytes.get(source, 0) + nbytes
+
+    # ---- output ----
+    def report(self) -> Dict:
+        with self._lock:
+            stages = {k: dict(v, seconds=round(v["seconds"], 4), max_seconds=round(v["max_seconds"], 4))
+                      for k, v in self.stages.items()}
+            return {
+                "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+                "wall_seconds": round(time.perf_counter() - self._t0, 3),
+                "peak_rss_mb": peak_rss_mb(),
+                "bytes": dict(self.bytes),
+                "stages": stages,
+                "urls": list(self.urls),
+            }
+
+    def summary(self, top_urls: int = 5) -> str:
+        rep = self.report()
+        lines = [f"{'stage':<28}{'calls':>7}{'total s':>10}{'max s':>9}{'rows':>9}{'rss MB':>9}"]
+        for name, st in sorted(rep["stages"].items(), key=lambda kv: -kv[1]["seconds"]):
+            rss = "" if st["peak_rss_mb"] is None else f"{st['peak_rss_mb']:.1f}"
+            lines.append(f"{name:<28}{st['calls']:>7}{st['seconds']:>10.3f}{st['max_seconds']:>9.3f}"
+                         f"{st['rows']:>9}{rss:>9}")
+        b = rep["bytes"]
+        lines.append(f"\nwall {rep['wall_seconds']}s · peak RSS {rep['peak_rss_mb']} MB · "
+                     f"{b.get('network', 0) / 1e6:.2f} MB from network, {b.get('cache', 0) / 1e6:.2f} MB from cache "
+                     f"({len(rep['urls'])} fetches)")
+        slow = sorted(rep["urls"], key=lambda u: -u["seconds"])[:top_urls]
+        if slow:
+            lines.append("slowest fetches:")
+            lines += [f"  {u['seconds']:>7.3f}s {u['bytes']:>9}B {u['source']:<7} {u['url']}" for u in slow]
+        return "\n".join(lines)
+
+    def write(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=1, default=str)
+        return path
+
+PROFILER = Profiler()
+
+def timed(name: str, rows: Callable = _size):
+    """Decorator: record wall time (and rows = rows(result)) under stage `name` when profiling."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not PROFILER.enabled:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            result = fn(*args, **kwargs)
+            PROFILER.add_stage(name, time.perf_counter() - t0, rows(result))
+            return result
+        return inner
+    return wrap
+
+def finish(out_dir: str = ".profiles") -> str:
+    """Write the JSON report, print the summary table and return the report path."""
+    path = PROFILER.write(os.path.join(out_dir, f"profile-{datetime.now():%Y%m%d-%H%M%S}.json"))
+    print("\n" + PROFILER.summary())
+    print(f"\nProfile report → {path}")
+    return path
@@ -1,24 +1,39 @@
-import os, re, time, urllib.parse
-from datetime import date, timedelta
+import os, re, sys, hashlib
+from datetime import date
 from typing import List, Dict, Optional, Set
-import requests
 import pandas as pd
-from bs4 import BeautifulSoup
-from ics import Calendar
-from pytrends.request import TrendReq
+from crawler import HostThrottle, crawl_schools
+from http_cache import CachedFetcher
+from event_store import EventStore
+from finals_extract import FinalsExtractor, guess_term
+from frontier import Frontier, load_seeds
+from incremental import incremental_update, extraction_params
+from profiling import PROFILER, timed, finish
+from finals_weekly import expand_intervals_daily
+from finals_index import FinalsIndex
+from storage import load_table, save_table, write_columnar, columnar_path
+from trends_fetch import TrendsFetcher
+import features
+import trends_resample
 
 # ------------------- SETTINGS -------------------
 HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; FinalsICS/1.0)"}
 TIMEOUT = 25
-DELAY   = 1.5
+DELAY   = 1.5     # per-host politeness delay (seconds)
+WORKERS = 8       # schools crawled concurrently
 MIN_YEAR = 2019
 MAX_YEAR = date.today().year
 
 PROJECT_ROOT = "."
 DATA_RAW  = os.path.join(PROJECT_ROOT, "data_raw")
 DATA_OUT  = os.path.join(PROJECT_ROOT, "data_derived")
-os.makedirs(DATA_RAW, exist_ok=True)
-os.makedirs(DATA_OUT, exist_ok=True)
+FINALS_CSV = os.path.join(DATA_RAW, "finals_boston_universities.csv")
+TRENDS_CSV = os.path.join(DATA_RAW, "trends_us_ma_2019_to_today.csv")
+WEEKLY_CSV = os.path.join(DATA_OUT, "finals_weekly_intensity.csv")
+MERGED_CSV = os.path.join(DATA_OUT, "trends_finals_weekly_merged.csv")   # weekly trends + finals, before features
+TIDY_CSV   = os.path.join(DATA_OUT, "pizza_vs_finals_weekly_tidy.csv")
+MANIFEST  = os.path.join(DATA_RAW, "finals_manifest.json")   # per-feed hashes for --incremental
+COLUMNAR  = None   # "parquet" / "arrow" to also write typed columnar copies (--columnar=...)
 
 # Schools + starting calendar pages 
 SCHOOLS = [
@@ -32,252 +47,221 @@ SCHOOLS = [
 ]
 
 FINAL_KEYS = re.compile(r"\b(final|finals|exam|examination)\b", re.I)
+LOOKS_CALENDAR = re.compile(r"(calendar|academic|schedule|dates|exam|final)", re.I)   # subpages worth following
 
 KEYWORDS = ["pizza near me", "coffee near me"]   
 GEO = "US-MA"
+TRENDS_METHOD = "step"   # monthly / weekly Trends onto the week spine: "step" or "linear"
 TIMEFRAME = f"2019-01-01 {date.today().isoformat()}"
 
-# ------------------- HELPERS -------------------
-def get_html(url: str) -> Optional[str]:
-    try:
-        r = requests.get(url, headers=HEADERS, timeout=TIMEOUT)
-        if r.status_code != 200:
-            print(f"  ! HTTP {r.status_code} for {url}")
-            return None
-        return r.text
-    except Exception as e:
-        print(f"  ! Error fetching {url}: {e}")
-        return None
+THROTTLE = HostThrottle(DELAY)
+# shared pooled session + conditional-GET cache for pages and .ics feeds
+FETCHER  = CachedFetcher(os.path.join(PROJECT_ROOT, ".http_cache"), headers=HEADERS, timeout=TIMEOUT,
+                         pool_size=WORKERS, throttle=THROTTLE)
+# link discovery: normalized-URL dedup, robots.txt (+ Crawl-delay), per-host budgets
+FRONTIER = Frontier(FETCHER, "FinalsICS", THROTTLE, looks_calendar=LOOKS_CALENDAR)
+TRENDS   = TrendsFetcher(os.path.join(PROJECT_ROOT, ".trends_cache"))
 
-def same_domain(base_url: str, link: str) -> bool:
-    try:
-        bu = urllib.parse.urlparse(base_url)
-        lu = urllib.parse.urlparse(link)
-        return (lu.netloc == "" or lu.netloc == bu.netloc)
-    except Exception:
-        return False
+# ------------------- HELPERS -------------------
+def ensure_dirs():
+    os.makedirs(DATA_RAW, exist_ok=True)
+    os.makedirs(DATA_OUT, exist_ok=True)
 
+@timed("discover_ics_links")
 def discover_ics_links(start_url: str, max_links: int = 8) -> List[str]:
-    """Find .ics links on the page and immediate same-domain pages that look like calendars."""
-    html = get_html(start_url)
-    if not html:
-        return []
-    soup = BeautifulSoup(html, "lxml")
-
-    # Collect candidate links on the start page
-    links = []
-    for a in soup.find_all("a", href=True):
-        href = a["href"].strip()
-        full = urllib.parse.urljoin(start_url, href)
-        links.append(full)
-
-    # Filter any direct .ics links
-    ics_links = [u for u in links if u.lower().endswith(".ics") and same_domain(start_url, u)]
-    if ics_links:
-        return list(dict.fromkeys(ics_links))[:max_links]
-
-    # If none, follow a few same-domain "calendar-y" pages and look there for .ics
-    looks_calendar = re.compile(r"(calendar|academic|schedule|dates|exam|final)", re.I)
-    subpages = [u for u in links if same_domain(start_url, u) and looks_calendar.search(u)]
-    subpages = list(dict.fromkeys(subpages))[:max_links]
+    """Find same-domain .ics links on the start page, or on calendar-looking pages a few hops away."""
+    return FRONTIER.discover(start_url, max_links)
 
-    found = []
-    for sp in subpages:
-        time.sleep(DELAY)
-        html2 = get_html(sp)
-        if not html2:
-            continue
-        soup2 = BeautifulSoup(html2, "lxml")
-        for a in soup2.find_all("a", href=True):
-            href2 = a["href"].strip()
-            full2 = urllib.parse.urljoin(sp, href2)
-            if full2.lower().endswith(".ics") and same_domain(start_url, full2):
-                found.append(full2)
+# .ics -> finals windows (parse_ics, finals_from_ics, crawl_school, … see finals_extract)
+EXTRACTOR = FinalsExtractor(FETCHER, FINAL_KEYS, MIN_YEAR, MAX_YEAR, discover_ics_links)
 
-    return list(dict.fromkeys(found))[:max_links]
+def build_finals_csv(incremental: bool = False, columnar: Optional[str] = COLUMNAR,
+                     schools: List[Dict] = SCHOOLS) -> pd.DataFrame:
+    ensure_dirs()
+    out = FINALS_CSV
+    if incremental:
+        print("Refreshing finals incrementally from the scrape manifest…\n")
+        df = incremental_update(schools, out, MANIFEST, discover_ics_links, FETCHER,
+                                EXTRACTOR.finals_from_response, guess_term,
+                                lambda items, fn: crawl_schools(items, fn, WORKERS),
+                                extraction_params(MIN_YEAR, MAX_YEAR, FINAL_KEYS))
+        if columnar:
+            write_columnar(df, columnar_path(out, columnar), "finals")
+        return df
 
-def parse_ics(url: str) -> List[Dict]:
-    """Return list of events (title, description, start_date, end_date, source_url)."""
-    try:
-        r = requests.get(url, headers=HEADERS, timeout=TIMEOUT)
-        if r.status_code != 200:
-            print(f"    ! HTTP {r.status_code} for ICS {url}")
-            return []
-        cal = Calendar(r.text)
-        out = []
-        for ev in cal.events:
-            # Event times: ics uses inclusive start, exclusive end for all-day
-            start = ev.begin.date() if hasattr(ev.begin, "date") else None
-            end   = ev.end.date()   if hasattr(ev.end, "date")   else None
-            if not start or not end:
-                continue
-            # Normalize to inclusive end date
-            end_inclusive = end - timedelta(days=1)
-            title = (ev.name or "").strip()
-            desc  = (ev.description or "").strip()
-            out.append({
-                "title": title,
-                "description": desc,
-                "start": start,
-                "end": end_inclusive,
-                "source_url": url
-            })
-        return out
-    except Exception as e:
-        print(f"    ! Error parsing ICS {url}: {e}")
-        return []
-
-def guess_term(month: int) -> str:
-    if month in (4,5,6):  return "Spring"
-    if month in (11,12):  return "Fall"
-    return "Unknown"
-
-def finals_from_events(events: List[Dict]) -> List[Dict]:
-    rows = []
-    for ev in events:
-        if not (MIN_YEAR <= ev["start"].year <= MAX_YEAR or MIN_YEAR <= ev["end"].year <= MAX_YEAR):
-            continue
-        text = f"{ev['title']} {ev['description']}"
-        if not FINAL_KEYS.search(text):
-            continue
-        s, e = ev["start"], ev["end"]
-        if e < s:
-            s, e = e, s
-        rows.append({"start": s, "end": e, "source_url": ev["source_url"]})
-    # de-dup
-    dedup = {(r["start"], r["end"], r["source_url"]) for r in rows}
-    return [{"start": s, "end": e, "source_url": u} for (s,e,u) in sorted(dedup)]
-
-def build_finals_csv() -> pd.DataFrame:
-    all_rows = []
-    print("Discovering .ics feeds and extracting finals…")
-    for item in SCHOOLS:
-        school, start = item["school"], item["start"]
-        print(f"\n{school} → {start}")
-        time.sleep(DELAY)
-        ics_links = discover_ics_links(start)
-        if not ics_links:
-            print("  (no ICS links found on initial pages)")
-            continue
-        for ics in ics_links:
-            print(f"  ICS: {ics}")
-            time.sleep(DELAY)
-            events = parse_ics(ics)
-            finals = finals_from_events(events)
-            if not finals:
-                print("    (no finals-like events in this ICS)")
-                continue
-            for w in finals:
-                term = guess_term(w["start"].month)
-                all_rows.append({
-                    "school": school,
-                    "term": term,
-                    "year": w["start"].year,
-                    "finals_start": w["start"].isoformat(),
-                    "finals_end": w["end"].isoformat(),
-                    "source_url": w["source_url"]
-                })
-
-    df = pd.DataFrame(all_rows)
-    if df.empty:
-        # create empty with headers for downstream compatibility
-        df = pd.DataFrame(columns=["school","term","year","finals_start","finals_end","source_url"])
-    else:
-        df = df.drop_duplicates(subset=["school","finals_start","finals_end"]).sort_values(
-            ["school","year","finals_start"]
-        )
-    out = os.path.join(DATA_RAW, "finals_boston_universities.csv")
-    df.to_csv(out, index=False)
+    print("Discovering .ics feeds and extracting finals…\n")
+    store = EventStore.concat(crawl_schools(schools, EXTRACTOR.crawl_school, WORKERS))
+    # dedup + term / year columns on the store; empty stores still get the headers
+    df = store.unique(("school", "start", "end")).to_frame(guess_term)
+    save_table(df, out, "finals", columnar)
     print(f"\nSaved finals → {out} (rows={len(df)})")
     return df
 
 # ---------- google Trends + merge  ----------
+@timed("get_trends")
 def get_trends(keywords, geo, timeframe):
-    pytrends = TrendReq(hl="en-US", tz=0)
-    all_df = None
-    for kw in keywords:
-        pytrends.build_payload([kw], timeframe=timeframe, geo=geo, cat=0, gprop="")
-        df = pytrends.interest_over_time().reset_index()
-        if df.empty:
-            raise RuntimeError(f"Empty Trends for '{kw}'. Try broader geo/shorter timeframe.")
-        col = kw.replace(" ", "_")
-        df = df.rename(columns={"date": "date", kw: col})
-        if "isPartial" in df.columns:
-            df = df.drop(columns=["isPartial"])
-        df["date"] = pd.to_datetime(df["date"]).dt.date
-        df = df[["date", col]]
-        all_df = df if all_df is None else pd.merge(all_df, df, on="date", how="outer")
-    return all_df.sort_values("date").reset_index(drop=True)
-
-def to_week_start(d):
-    d_ts = pd.to_datetime(d)
-    return (d_ts - pd.to_timedelta(d_ts.weekday(), unit="D")).date()
+    """Batched + cached pull; only the tail since the last snapshot hits Google."""
+    start, end = (date.fromisoformat(t) for t in timeframe.split())
+    df = TRENDS.fetch(keywords, geo, start, end)
+    print(f"  (Trends requests this run: {TRENDS.requests})")
+    return df
 
 def expand_finals_to_daily(df_finals: pd.DataFrame) -> pd.DataFrame:
-    rows = []
-    for _, r in df_finals.iterrows():
-        s = pd.to_datetime(r["finals_start"]).date()
-        e = pd.to_datetime(r["finals_end"]).date()
-        d = s
-        while d <= e:
-            rows.append({"date": d, "school": r["school"]})
-            d += timedelta(days=1)
-    return pd.DataFrame(rows)
+    daily = expand_intervals_daily(df_finals)
+    daily["date"] = pd.to_datetime(daily["date"]).dt.date
+    return daily
 
-def finals_weekly_intensity(df_finals: pd.DataFrame) -> pd.DataFrame:
-    if df_finals.empty:
+@timed("finals_weekly_intensity")
+def finals_weekly_intensity(df_finals: pd.DataFrame, index: Optional[FinalsIndex] = None) -> pd.DataFrame:
+    """Weekly distinct-school counts from the stage's FinalsIndex (built here if not passed)."""
+    if index is None and df_finals.empty:
         return pd.DataFrame(columns=["week_start","finals_school_count_week","is_finals_week"])
-    daily = expand_finals_to_daily(df_finals)
-    daily["week_start"] = daily["date"].apply(to_week_start)
-    g = daily.groupby("week_start")["school"].nunique().reset_index(name="finals_school_count_week")
+    g = (index if index is not None else FinalsIndex(df_finals)).weekly_intensity()
+    g["week_start"] = pd.to_datetime(g["week_start"]).dt.date
     g["is_finals_week"] = (g["finals_school_count_week"] > 0).astype(int)
     return g
 
-def align_trends_to_week(trends_df):
-    df = trends_df.copy()
-    df["week_start"] = df["date"].apply(to_week_start)
-    value_cols = [c for c in df.columns if c not in ["date","week_start"]]
-    return df.groupby("week_start", as_index=False)[value_cols].mean()
+@timed("align_trends_to_week")
+def align_trends_to_week(trends_df, method: str = TRENDS_METHOD):
+    """Gap-free Monday weeks from daily / weekly / monthly Trends (see trends_resample)."""
+    return trends_resample.align_trends_to_week(trends_df, method)
 
-def add_features(merged):
-    df = merged.copy()
-    df["week_end"] = pd.to_datetime(df["week_start"]) + pd.Timedelta(days=6)
-    df["month"] = pd.to_datetime(df["week_start"]).dt.month
-    df["year"]  = pd.to_datetime(df["week_start"]).dt.year
-    for col in [c for c in df.columns if c.endswith("_near_me")]:
-        df[f"{col}_ma4"] = df[col].rolling(4, min_periods=1).mean()
-    return df
+def merge_weekly(trends_weekly: pd.DataFrame, finals_weekly: pd.DataFrame) -> pd.DataFrame:
+    """Trends weeks + finals counts, joined on the week ordinal index (weeks without finals -> 0)."""
+    return trends_resample.join_weekly(trends_weekly, finals_weekly,
+                                       ["finals_school_count_week", "is_finals_week"])
 
-def main():
-    # 1) finals CSV from discovered ICS feeds
-    finals_df = build_finals_csv()
+@timed("add_features")
+def add_features(merged, value_cols: Optional[List[str]] = None, windows: Optional[List[int]] = None):
+    """Calendar columns + moving averages, <col>_ma4 by default (defaults to every *_near_me column)."""
+    return features.add_features(merged, value_cols, windows)
 
-    # 2) save a snapshot of Trends
+def weekly_tail(index: FinalsIndex, trends: pd.DataFrame, since: date) -> pd.DataFrame:
+    """merge_weekly() rows for weeks >= since (a Monday), built from only the recent Trends rows.
+
+    The two observations before `since` are kept too: the period running into `since`
+    (step) and the anchor before it (linear) still shape the first tail weeks.
+    """
+    dates = pd.to_datetime(trends["date"])
+    before = dates[dates < pd.Timestamp(since)].drop_duplicates().nlargest(2)
+    recent = trends[dates >= (before.min() if len(before) else pd.Timestamp(since))]
+    finals_weekly = finals_weekly_intensity(None, index)
+    finals_weekly = finals_weekly[pd.to_datetime(finals_weekly["week_start"]) >= pd.Timestamp(since)]
+    weekly = align_trends_to_week(recent)
+    weekly = weekly[pd.to_datetime(weekly["week_start"]) >= pd.Timestamp(since)]
+    return merge_weekly(weekly, finals_weekly)
+
+def history_fingerprint(index: FinalsIndex, trends: pd.DataFrame, since: date) -> str:
+    """Hash of the inputs behind every week before `since` (Trends rows + finals week counts)."""
+    cut = pd.Timestamp(since)
+    t = trends.assign(date=pd.to_datetime(trends["date"]))
+    w = finals_weekly_intensity(None, index)
+    w = w.assign(week_start=pd.to_datetime(w["week_start"]))
+    h = hashlib.sha256()
+    h.update(pd.util.hash_pandas_object(t[t["date"] < cut], index=False).to_numpy().tobytes())
+    h.update(pd.util.hash_pandas_object(w[w["week_start"] < cut], index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+# ------------------- STAGES -------------------
+# Each stage reads the previous stage's saved table when not handed it, so cli.py can
+# run any one of them on its own.
+def trends_csv(geo: str = GEO, keywords: List[str] = KEYWORDS) -> str:
+    """TRENDS_CSV for the default pull, else data_raw/trends_<geo>_<keywords>_2019_to_today.csv."""
+    if geo == GEO and list(keywords) == KEYWORDS:
+        return TRENDS_CSV
+    slug = "_".join(re.sub(r"[^a-z0-9]+", "-", k.lower()).strip("-") for k in keywords)
+    return os.path.join(DATA_RAW, f"trends_{geo.lower().replace('-', '_')}_{slug}_2019_to_today.csv")
+
+def build_trends_csv(columnar: Optional[str] = COLUMNAR, keywords: List[str] = KEYWORDS,
+                     geo: str = GEO, timeframe: str = TIMEFRAME) -> pd.DataFrame:
+    ensure_dirs()
     print("\nPulling Google Trends…")
-    trends = get_trends(KEYWORDS, GEO, TIMEFRAME)
-    trends_path = os.path.join(DATA_RAW, "trends_us_ma_2019_to_today.csv")
-    trends.to_csv(trends_path, index=False)
-    print(f"Saved Trends → {trends_path} (rows={len(trends)})")
+    trends = get_trends(keywords, geo, timeframe)
+    out = trends_csv(geo, keywords)
+    save_table(trends, out, "trends", columnar)
+    print(f"Saved Trends → {out} (rows={len(trends)})")
+    return trends
 
-    # 3) week by week aggregation & merge
+def build_weekly(finals_df: Optional[pd.DataFrame] = None, trends: Optional[pd.DataFrame] = None,
+                 columnar: Optional[str] = COLUMNAR) -> pd.DataFrame:
+    """Finals weekly intensity + weekly Trends, merged on week_start."""
+    ensure_dirs()
+    if finals_df is None:
+        finals_df = load_table(FINALS_CSV, "finals")
+    if trends is None:
+        trends = load_table(TRENDS_CSV, "trends")
     print("\nAggregating and merging…")
-    finals_weekly = finals_weekly_intensity(finals_df)
-    finals_weekly.to_csv(os.path.join(DATA_OUT, "finals_weekly_intensity.csv"), index=False)
+    finals_weekly = finals_weekly_intensity(finals_df, FinalsIndex(finals_df))
+    save_table(finals_weekly, WEEKLY_CSV, "weekly", columnar)
 
     trends_weekly = align_trends_to_week(trends)
-    merged = pd.merge(trends_weekly, finals_weekly, on="week_start", how="left")
-    if "finals_school_count_week" not in merged.columns:
-        merged["finals_school_count_week"] = 0
-        merged["is_finals_week"] = 0
-    merged[["finals_school_count_week","is_finals_week"]] = merged[
-        ["finals_school_count_week","is_finals_week"]
-    ].fillna(0).astype(int)
+    merged = merge_weekly(trends_weekly, finals_weekly)
+    save_table(merged, MERGED_CSV, "weekly", columnar)
+    return merged
 
-    final_df = add_features(merged)
-    out_path = os.path.join(DATA_OUT, "pizza_vs_finals_weekly_tidy.csv")
-    final_df.to_csv(out_path, index=False)
-    print(f"\n✅ Done. Saved tidy dataset → {out_path} (rows={len(final_df)})")
+def merged_is_current() -> bool:
+    """MERGED_CSV exists and is no older than the finals / Trends tables it was built from."""
+    if not os.path.exists(MERGED_CSV):
+        return False
+    inputs = [os.path.getmtime(p) for p in (FINALS_CSV, TRENDS_CSV) if os.path.exists(p)]
+    return os.path.getmtime(MERGED_CSV) >= max(inputs, default=0)
+
+def build_tidy(merged: Optional[pd.DataFrame] = None, columnar: Optional[str] = COLUMNAR,
+               append: bool = False, windows: Optional[List[int]] = None,
+               finals_df: Optional[pd.DataFrame] = None, trends: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """Tidy table with moving averages. append=True only recomputes recent and new weeks
+    (see features.py) and falls back to a full rebuild when the saved state can't be used."""
+    ensure_dirs()
+    if finals_df is None:
+        finals_df = load_table(FINALS_CSV, "finals")
+    if trends is None:
+        trends = load_table(TRENDS_CSV, "trends")
+    index = FinalsIndex(finals_df)      # one index for the fingerprint, the tail and the merge
+    fingerprint = lambda since: history_fingerprint(index, trends, since)
+
+    if append:
+        state = features.load_state(TIDY_CSV)
+        if state is not None and state["tail"]:
+            tail = weekly_tail(index, trends, features.revise_from(state))
+            with PROFILER.stage("append_features"):
+                out = features.append_features(tail, TIDY_CSV, windows, fingerprint)
+            if out is not None:
+                if columnar:
+                    write_columnar(load_table(TIDY_CSV, "weekly"), columnar_path(TIDY_CSV, columnar), "weekly")
+                print(f"\n✅ Updated tidy dataset → {TIDY_CSV} ({len(out)} recent weeks recomputed)")
+                return out
+        print("  (no usable feature state; rebuilding the tidy table)")
+
+    if merged is None and merged_is_current():
+        merged = load_table(MERGED_CSV, "weekly")
+    if merged is None:
+        merged = merge_weekly(align_trends_to_week(trends), finals_weekly_intensity(finals_df, index))
+    with PROFILER.stage("add_features"):
+        final_df = features.write_features(merged, TIDY_CSV, windows=windows, fingerprint=fingerprint)
+    if columnar:
+        write_columnar(final_df, columnar_path(TIDY_CSV, columnar), "weekly")
+    print(f"\n✅ Done. Saved tidy dataset → {TIDY_CSV} (rows={len(final_df)})")
     print("\nColumns:", ", ".join(final_df.columns))
+    return final_df
+
+def main(incremental: bool = False, columnar: Optional[str] = COLUMNAR, schools: List[Dict] = SCHOOLS):
+    # 1) finals CSV from discovered ICS feeds
+    finals_df = build_finals_csv(incremental, columnar, schools)
+    # 2) save a snapshot of Trends
+    trends = build_trends_csv(columnar)
+    # 3) week by week aggregation & merge, then features
+    merged = build_weekly(finals_df, trends, columnar)
+    build_tidy(merged, columnar, finals_df=finals_df, trends=trends)
 
 if __name__ == "__main__":
-    main()
+    fmt = next((a.split("=", 1)[1] for a in sys.argv if a.startswith("--columnar=")), COLUMNAR)
+    seeds = next((a.split("=", 1)[1] for a in sys.argv if a.startswith("--seeds=")), None)
+    profile = "--profile" in sys.argv
+    if profile:
+        PROFILER.enable()
+    try:
+        main(incremental="--incremental" in sys.argv, columnar=fmt,
+             schools=load_seeds(seeds) if seeds else SCHOOLS)
+    finally:
+        if profile:
+            finish()
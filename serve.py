@@ -0,0 +1,334 @@
+import os, sys, json, time, threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+import pandas as pd
+from features import WINDOWS, ma_col, rolling_mean
+from finals_index import FinalsIndex
+from finals_weekly import day_ordinals, week_ordinals, EPOCH_SHIFT
+from scrape_finals import FINALS_CSV, TRENDS_CSV, TIDY_CSV
+from storage import FORMATS, columnar_path, load_table
+import trends_resample
+
+# Local HTTP/JSON query service. Finals intervals, Trends and the weekly tidy table
+# are loaded once; day / week intensity arrays, the FinalsIndex and per-keyword
+# value arrays are built at load, so a query is a couple of searchsorted calls and a
+# slice. Encoded responses sit in an LRU cache. A watcher thread re-stats the input
+# files (and their columnar copies) and swaps in a freshly built snapshot when the
+# pipeline rewrites one; the old snapshot keeps serving until the new one is ready.
+#
+#   python serve.py --port=8765
+#   GET /intensity?start=2024-04-01&end=2024-06-30[&freq=day]
+#   GET /schools?date=2024-05-10            (or &end=2024-05-17 for a range)
+#   GET /series?keyword=pizza_near_me&windows=4,8[&start=...&end=...]
+#   GET /health
+
+# ------------------- SETTINGS -------------------
+HOST          = "127.0.0.1"
+PORT          = 8765
+CACHE_SIZE    = 1024      # cached responses
+POLL_SECONDS  = 2.0       # how often the watcher re-stats the data files
+MAX_SPAN_DAYS = 366 * 30  # longest range a query may ask for
+MAX_WINDOW    = 104       # longest moving average (weeks)
+
+class QueryError(ValueError):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+def parse_day(value: Optional[str], name: str) -> int:
+    if not value:
+        raise QueryError(f"missing '{name}' (YYYY-MM-DD)")
+    try:
+        return int(np.datetime64(value, "D").astype(np.int64))
+    except ValueError:
+        raise QueryError(f"bad date for '{name}': {value!r}")
+
+def iso(days: np.ndarray) -> List[str]:
+    return np.datetime_as_string(days.astype("datetime64[D]"), unit="D").tolist()
+
+def floats(values: np.ndarray) -> List[Optional[float]]:
+    return [None if v != v else v for v in values.tolist()]   # NaN -> null
+
+# ------------------- SNAPSHOT -------------------
+class Snapshot:
+    """Everything one generation of the data answers queries from; read-only once built."""
+
+    def __init__(self, finals: pd.DataFrame, trends: pd.DataFrame, tidy: Optional[pd.DataFrame]):
+        self.loaded_at = time.time()
+        self.index = FinalsIndex(finals)
+        self.rows = {"finals": len(finals), "trends": len(trends), "tidy": 0 if tidy is None else len(tidy)}
+
+        # dense finals counts per day / week over the indexed span
+        ix = self.index
+        if len(ix):
+            self.day0 = int(ix.start.min())
+            days = np.arange(self.day0, int(ix.end.max()) + 1)
+            self.day_counts = (np.searchsorted(ix.start, days, side="right")
+                               - np.searchsorted(ix.end_sorted, days, side="left"))
+            self.week0 = int(ix.week_start_sorted[0])
+            weeks = np.arange(self.week0, int(ix.week_end_sorted.max()) + 1)
+            self.week_counts = (np.searchsorted(ix.week_start_sorted, weeks, side="right")
+                                - np.searchsorted(ix.week_end_sorted, weeks, side="left"))
+        else:
+            self.day0 = self.week0 = 0
+            self.day_counts = self.week_counts = np.zeros(0, dtype=np.int64)
+
+        # keyword series: the tidy table's weeks, or the dense Trends week spine without one
+        if tidy is None or tidy.empty:
+            tidy = trends_resample.align_trends_to_week(trends)
+        tidy = tidy.sort_values("week_start")
+        self.weeks = week_ordinals(day_ordinals(tidy["week_start"]))
+        keywords = [c for c in trends_resample.value_columns(trends) if c in tidy.columns]
+        self.values = {k: tidy[k].to_numpy(dtype="float64") for k in keywords}
+        self._ma: Dict[Tuple[str, int], np.ndarray] = {}
+        for k in keywords:
+            for w in WINDOWS:
+                if ma_col(k, w) in tidy.columns:
+                    self._ma[(k, w)] = tidy[ma_col(k, w)].to_numpy(dtype="float64")
+        self._lock = threading.Lock()
+
+    def moving_average(self, keyword: str, window: int) -> np.ndarray:
+        key = (keyword, window)
+        if key not in self._ma:
+            ma = rolling_mean(self.values[keyword], window)
+            with self._lock:
+                self._ma.setdefault(key, ma)
+        return self._ma[key]
+
+    # ---- queries ----
+    def intensity(self, q: Dict[str, str]) -> Dict:
+        a, b = parse_day(q.get("start"), "start"), parse_day(q.get("end"), "end")
+        if b < a or b - a > MAX_SPAN_DAYS:
+            raise QueryError("need start <= end within the maximum span")
+        freq = q.get("freq", "week")
+        if freq == "day":
+            days = np.arange(a, b + 1)
+            return {"freq": "day", "date": iso(days), "count": self._slice(self.day_counts, self.day0, a, b)}
+        if freq != "week":
+            raise QueryError("freq must be 'day' or 'week'")
+        wa, wb = int(week_ordinals(np.int64(a))), int(week_ordinals(np.int64(b)))
+        weeks = np.arange(wa, wb + 1)
+        return {"freq": "week", "week_start": iso(weeks * 7 - EPOCH_SHIFT),
+                "count": self._slice(self.week_counts, self.week0, wa, wb)}
+
+    @staticmethod
+    def _slice(counts: np.ndarray, origin: int, a: int, b: int) -> List[int]:
+        out = np.zeros(b - a + 1, dtype=np.int64)
+        lo, hi = max(a, origin), min(b, origin + len(counts) - 1)
+        if lo <= hi:
+            out[lo - a:hi - a + 1] = counts[lo - origin:hi - origin + 1]
+        return out.tolist()
+
+    def schools(self, q: Dict[str, str]) -> Dict:
+        a = parse_day(q.get("date") or q.get("start"), "date")
+        b = parse_day(q["end"], "end") if q.get("end") else a
+        if b < a:
+            raise QueryError("need date <= end")
+        names = self.index.schools_between(np.datetime64(a, "D"), np.datetime64(b, "D"))
+        out = {"date": iso(np.array([a]))[0], "count": len(names), "schools": names}
+        if b != a:
+            out["end"] = iso(np.array([b]))[0]
+        return out
+
+    def series(self, q: Dict[str, str]) -> Dict:
+        keyword = (q.get("keyword") or "").strip().replace(" ", "_")
+        if keyword not in self.values:
+            raise QueryError(f"unknown keyword {keyword!r}; have {sorted(self.values)}", 404)
+        try:
+            windows = [int(w) for w in q["windows"].split(",") if w] if q.get("windows") else list(WINDOWS)
+        except ValueError:
+            raise QueryError("windows must be integers, e.g. 4,8")
+        if any(not 1 <= w <= MAX_WINDOW for w in windows):
+            raise QueryError(f"windows must be between 1 and {MAX_WINDOW}")
+        # windows run over the whole series, so the first weeks of a range are seeded by history
+        lo, hi = 0, len(self.weeks)
+        if q.get("start"):
+            lo = int(np.searchsorted(self.weeks, week_ordinals(np.int64(parse_day(q["start"], "start")))))
+        if q.get("end"):
+            hi = int(np.searchsorted(self.weeks, week_ordinals(np.int64(parse_day(q["end"], "end"))), side="right"))
+        out = {"keyword": keyword, "week_start": iso(self.weeks[lo:hi] * 7 - EPOCH_SHIFT),
+               "value": floats(self.values[keyword][lo:hi])}
+        for w in windows:
+            out[f"ma{w}"] = floats(self.moving_average(keyword, w)[lo:hi])
+        return out
+
+def load_snapshot(finals_csv: str = FINALS_CSV, trends_csv: str = TRENDS_CSV,
+                  tidy_csv: str = TIDY_CSV) -> Snapshot:
+    finals = load_table(finals_csv, "finals")
+    trends = load_table(trends_csv, "trends")
+    tidy = load_table(tidy_csv, "weekly") if os.path.exists(tidy_csv) else None
+    return Snapshot(finals, trends, tidy)
+
+# ------------------- CACHE -------------------
+class LRUCache:
+    """Thread-safe LRU of encoded responses."""
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key) -> Optional[bytes]:
+        with self._lock:
+            body = self._data.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body: bytes):
+        with self._lock:
+            self._data[key] = body
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+# ------------------- SERVICE -------------------
+class Service:
+    """Current snapshot + response cache + file watcher."""
+
+    def __init__(self, finals_csv: str = FINALS_CSV, trends_csv: str = TRENDS_CSV,
+                 tidy_csv: str = TIDY_CSV, cache_size: int = CACHE_SIZE):
+        self.paths = [finals_csv, trends_csv, tidy_csv]
+        self.cache = LRUCache(cache_size)
+        self._stamp = self.stamp()
+        # (snapshot, generation), swapped in one assignment so readers never see a mixed pair
+        self.current: Tuple[Snapshot, int] = (load_snapshot(*self.paths), 0)
+        self._stop = threading.Event()
+        self.routes: Dict[str, Callable[[Snapshot, Dict[str, str]], Dict]] = {
+            "/intensity": Snapshot.intensity, "/schools": Snapshot.schools, "/series": Snapshot.series,
+        }
+
+    @property
+    def snapshot(self) -> Snapshot:
+        return self.current[0]
+
+    @property
+    def generation(self) -> int:
+        return self.current[1]
+
+    def stamp(self) -> tuple:
+        """(mtime, size) of every input file and columnar copy; any change means reload."""
+        out = []
+        for p in self.paths:
+            for f in [p] + [columnar_path(p, fmt) for fmt in FORMATS]:
+                try:
+                    st = os.stat(f)
+                    out.append((f, st.st_mtime_ns, st.st_size))
+                except OSError:
+                    out.append((f, None, None))
+        return tuple(out)
+
+    def reload_if_changed(self) -> bool:
+        stamp = self.stamp()
+        if stamp == self._stamp:
+            return False
+        try:
+            snap = load_snapshot(*self.paths)
+        except Exception as e:        # half-written file: keep serving, retry on the next poll
+            print(f"  ! Reload failed, keeping the previous data: {e}")
+            return False
+        gen = self.current[1] + 1       # only the watcher thread writes `current`
+        self.current, self._stamp = (snap, gen), stamp
+        self.cache.clear()
+        print(f"✅ Reloaded data (generation {gen}, rows={snap.rows})")
+        return True
+
+    def watch(self, every: float = POLL_SECONDS):
+        def loop():
+            while not self._stop.wait(every):
+                self.reload_if_changed()
+        threading.Thread(target=loop, name="data-watcher", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def query(self, path: str, query: str) -> Tuple[int, bytes]:
+        if path in ("/", "/health"):
+            return 200, self._encode(self.health())
+        route = self.routes.get(path)
+        if route is None:
+            return 404, self._encode({"error": f"unknown endpoint {path}", "endpoints": sorted(self.routes)})
+        q = {k: v[-1] for k, v in parse_qs(query).items()}
+        snap, gen = self.current
+        key = (gen, path, tuple(sorted(q.items())))
+        body = self.cache.get(key)
+        if body is not None:
+            return 200, body
+        try:
+            body = self._encode(route(snap, q))
+        except QueryError as e:
+            return e.status, self._encode({"error": str(e)})
+        except Exception as e:          # never leave a request without a response
+            print(f"  ! Error answering {path}?{query}: {e}")
+            return 500, self._encode({"error": "internal error"})
+        self.cache.put(key, body)
+        return 200, body
+
+    def health(self) -> Dict:
+        snap, gen = self.current
+        return {"generation": gen, "loaded_at": snap.loaded_at, "rows": snap.rows,
+                "keywords": sorted(snap.values), "cache": {"size": len(self.cache), "hits": self.cache.hits,
+                                                           "misses": self.cache.misses},
+                "endpoints": sorted(self.routes)}
+
+    @staticmethod
+    def _encode(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+class Handler(BaseHTTPRequestHandler):
+    service: Service = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        status, body = self.service.query(url.path.rstrip("/") or "/", url.query)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):   # keep the console for reload / error lines
+        pass
+
+def serve(host: str = HOST, port: int = PORT, service: Optional[Service] = None,
+          poll: float = POLL_SECONDS) -> ThreadingHTTPServer:
+    """Build the server (not started); call .serve_forever() on it."""
+    service = service or Service()
+    service.watch(poll)
+    handler = type("BoundHandler", (Handler,), {"service": service})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    return httpd
+
+def main(argv=None):
+    import argparse
+    p = argparse.ArgumentParser(prog="serve.py", description="Serve finals / Trends queries as JSON")
+    p.add_argument("--host", default=HOST)
+    p.add_argument("--port", type=int, default=PORT)
+    p.add_argument("--poll", type=float, default=POLL_SECONDS, help="seconds between data-file checks")
+    args = p.parse_args(argv)
+    httpd = serve(args.host, args.port, poll=args.poll)
+    print(f"Serving on http://{args.host}:{args.port}  (Ctrl-C to stop)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
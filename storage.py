@@ -0,0 +1,148 @@
+import os
+from typing import Dict, List, Optional
+import pandas as pd
+
+# Typed columnar copies of the pipeline's tables (Parquet or Arrow IPC / Feather v2).
+# CSV stays the interchange format; the columnar files carry date32 dates and
+# dictionary-encoded (categorical) labels, so readers skip date parsing entirely,
+# can project columns, and can memory-map the file. pyarrow is only needed here.
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+# fixed columns per table; any other column in trends / weekly is stored as float64
+SCHEMAS: Dict[str, Dict[str, str]] = {
+    "finals": {
+        "school": "category", "term": "category", "year": "int16",
+        "finals_start": "date32", "finals_end": "date32", "source_url": "category",
+    },
+    "trends": {"date": "date32"},
+    "weekly": {
+        "week_start": "date32", "week_end": "date32",
+        "finals_school_count_week": "int32", "is_finals_week": "int8",
+        "month": "int8", "year": "int16",
+    },
+    "panel": {
+        "geo": "category", "keyword": "category", "school_set": "category",
+        "week_start": "date32", "week_end": "date32",
+        "finals_school_count_week": "int32", "is_finals_week": "int8",
+        "month": "int8", "year": "int16",
+    },
+}
+REQUIRED = {
+    "finals": ["school", "finals_start", "finals_end"],
+    "trends": ["date"],
+    "weekly": ["week_start"],
+    "panel": ["geo", "keyword", "school_set", "week_start", "value"],
+}
+
+def _pa():
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError("Columnar storage needs pyarrow (pip install pyarrow).") from e
+    return pa
+
+def arrow_schema(df: pd.DataFrame, kind: str):
+    """pyarrow schema for `df` under the `kind` table's column types."""
+    pa = _pa()
+    types = {
+        "category": pa.dictionary(pa.int32(), pa.string()),
+        "date32": pa.date32(),
+        "int8": pa.int8(), "int16": pa.int16(), "int32": pa.int32(),
+        "float64": pa.float64(),
+    }
+    fixed = SCHEMAS[kind]
+    fields = []
+    for c in df.columns:
+        if str(c).startswith("Unnamed:"):
+            continue
+        fields.append(pa.field(str(c), types[fixed.get(c, "float64")]))
+    return pa.schema(fields)
+
+def to_arrow(df: pd.DataFrame, kind: str):
+    """Coerce `df` to the table schema; raises ValueError on missing or non-numeric columns.
+    Unparseable dates become nulls, as the CSV readers treat them."""
+    pa = _pa()
+    if kind not in SCHEMAS:
+        raise ValueError(f"Unknown table kind '{kind}' (expected one of {sorted(SCHEMAS)})")
+    missing = [c for c in REQUIRED[kind] if c not in df.columns]
+    if missing:
+        raise ValueError(f"{kind} table is missing columns: {', '.join(missing)}")
+    schema = arrow_schema(df, kind)
+    arrays = []
+    for field in schema:
+        col = df[field.name]
+        if pa.types.is_date32(field.type):
+            col = pd.to_datetime(col, errors="coerce").dt.date
+        elif pa.types.is_dictionary(field.type):
+            col = col.astype("string")
+        elif pa.types.is_integer(field.type):
+            col = pd.to_numeric(col, errors="raise")
+        else:
+            col = pd.to_numeric(col, errors="raise").astype("float64")
+        arrays.append(pa.array(col, type=field.type, from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def columnar_path(path: str, fmt: str) -> str:
+    """data_raw/x.csv + 'parquet' -> data_raw/x.parquet"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown columnar format '{fmt}' (expected parquet or arrow)")
+    return os.path.splitext(path)[0] + FORMATS[fmt]
+
+def write_columnar(df: pd.DataFrame, path: str, kind: str) -> str:
+    """Write `df` as Parquet or Arrow IPC depending on the extension of `path`."""
+    table = to_arrow(df, kind)
+    tmp = path + ".tmp"
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        pq.write_table(table, tmp, compression="zstd")
+    else:
+        import pyarrow.feather as feather
+        feather.write_feather(table, tmp, compression="uncompressed")  # keeps it mmap-able
+    os.replace(tmp, path)
+    return path
+
+def read_columnar(path: str, columns: Optional[List[str]] = None, timestamps: bool = False) -> pd.DataFrame:
+    """Memory-mapped read with optional column projection.
+
+    date32 columns come back as python dates (like the scripts use), or as
+    datetime64 with timestamps=True (like the notebook uses).
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        table = pq.read_table(path, columns=columns, memory_map=True)
+    else:
+        _pa()
+        import pyarrow.feather as feather
+        table = feather.read_table(path, columns=columns, memory_map=True)
+    df = table.to_pandas(date_as_object=not timestamps)
+    if timestamps:
+        for field in table.schema:
+            if str(field.type) == "date32[day]":
+                df[field.name] = df[field.name].astype("datetime64[ns]")
+    return df
+
+def save_table(df: pd.DataFrame, csv_path: str, kind: str, fmt: Optional[str] = None):
+    """Write the CSV as before and, if `fmt` is set, a typed columnar copy next to it."""
+    df.to_csv(csv_path, index=False)
+    if fmt:
+        write_columnar(df, columnar_path(csv_path, fmt), kind)
+
+def load_table(csv_path: str, kind: str, columns: Optional[List[str]] = None,
+               timestamps: bool = False) -> pd.DataFrame:
+    """Prefer an up-to-date columnar copy of `csv_path`; fall back to parsing the CSV."""
+    csv_mtime = os.path.getmtime(csv_path) if os.path.exists(csv_path) else -1
+    for fmt in FORMATS:
+        p = columnar_path(csv_path, fmt)
+        if os.path.exists(p) and os.path.getmtime(p) >= csv_mtime:
+            try:
+                return read_columnar(p, columns=columns, timestamps=timestamps)
+            except ImportError:
+                break
+    df = pd.read_csv(csv_path, usecols=columns, float_precision="round_trip")   # exact floats across stages
+    df = df[[c for c in df.columns if not str(c).startswith("Unnamed:")]]
+    for c, t in SCHEMAS[kind].items():
+        if t == "date32" and c in df.columns:
+            dt = pd.to_datetime(df[c], errors="coerce")   # a bad date is NaT, not a failed load
+            df[c] = dt if timestamps else dt.dt.date
+    return df
@@ -0,0 +1,4 @@
+import os, sys
+
+# the pipeline modules are flat top-level scripts
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,79 @@
+import re, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from crawler import HostThrottle, crawl_schools
+from finals_extract import FinalsExtractor, guess_term
+from frontier import Frontier
+from http_cache import CachedFetcher
+from test_ics_stream import FEED, KEYS
+
+DELAY = 0.4
+
+# a registrar site: a calendar subpage with the feed, and a robots-disallowed one
+PAGES = {
+    "/robots.txt": ("text/plain", "User-agent: *\nDisallow: /private/\n"),
+    "/start": ("text/html", '<a href="/academic-calendar">Calendar</a> <a href="/private/exam-calendar">Exams</a>'),
+    "/academic-calendar": ("text/html", '<a href="/finals.ics">Subscribe</a>'),
+    "/private/exam-calendar": ("text/html", '<a href="/secret.ics">Subscribe</a>'),
+    "/finals.ics": ("text/calendar", FEED),
+}
+
+@pytest.fixture
+def site():
+    log, lock = [], threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with lock:
+                log.append((self.headers["Host"].split(":")[0], self.path, time.monotonic()))
+            ctype, body = PAGES.get(self.path, ("text/plain", None))
+            self.send_response(200 if body is not None else 404)
+            data = (body or "not found").encode("utf-8")
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[1], log
+    server.shutdown()
+    server.server_close()
+
+def crawl(tmp_path, port):
+    throttle = HostThrottle(DELAY)
+    fetcher = CachedFetcher(str(tmp_path), throttle=throttle)
+    fetcher.session              # import requests up front, so it doesn't delay the first request
+    frontier = Frontier(fetcher, "FinalsICS-Test", throttle)
+    extractor = FinalsExtractor(fetcher, KEYS, 2019, 2030, lambda start: frontier.discover(start, 8))
+    schools = [{"school": "Loopback U", "start": f"http://127.0.0.1:{port}/start"},
+               {"school": "Localhost College", "start": f"http://localhost:{port}/start"}]
+    return crawl_schools(schools, extractor.crawl_school, workers=2)
+
+def test_crawl_against_local_sites(tmp_path, site):
+    port, log = site
+    stores = crawl(tmp_path, port)
+
+    frames = [s.to_frame(guess_term) for s in stores]
+    assert [list(f["school"].unique()) for f in frames] == [["Loopback U"], ["Localhost College"]]
+    assert all(list(f["finals_start"]) == ["2024-05-06", "2024-05-10"] for f in frames)
+
+    by_host = {}
+    for host, path, t in log:
+        by_host.setdefault(host, []).append((path, t))
+    assert sorted(by_host) == ["127.0.0.1", "localhost"]
+    for host, hits in by_host.items():
+        paths = [p for p, _ in hits]
+        # robots.txt first, the disallowed branch never requested
+        assert paths[0] == "/robots.txt" and not any(p.startswith("/private/") for p in paths)
+        assert "/finals.ics" in paths
+        # per-host politeness: consecutive requests at least DELAY apart (minus timer slack)
+        times = [t for _, t in hits]
+        assert min(b - a for a, b in zip(times, times[1:])) >= DELAY - 0.05
+
+    # hosts are crawled side by side: each one's requests overlap the other's
+    spans = [(hits[0][1], hits[-1][1]) for hits in by_host.values()]
+    assert max(s for s, _ in spans) < min(e for _, e in spans)
@@ -0,0 +1,14 @@
+import numpy as np
+import pandas as pd
+import pytest
+import features
+
+@pytest.mark.parametrize("values", [[], [3.0], [1.0, np.nan, 4.0], [np.nan, np.nan], list(range(10))])
+def test_rolling_mean_matches_pandas(values):
+    got = features.rolling_mean(np.array(values, dtype="float64"), 4)
+    want = pd.Series(values, dtype="float64").rolling(4, min_periods=1).mean().to_numpy()
+    np.testing.assert_array_equal(got, want)
+
+def test_rolling_mean_rejects_empty_window():
+    with pytest.raises(ValueError):
+        features.rolling_mean(np.ones(3), 0)
@@ -0,0 +1,32 @@
+from datetime import date
+from finals_extract import FinalsExtractor, guess_term
+from test_ics_stream import FEED, KEYS, URL
+
+class Resp:
+    def __init__(self, status_code: int, body: str = ""):
+        self.status_code, self.body = status_code, body
+
+    def iter_text(self):
+        yield from (self.body[i:i + 64] for i in range(0, len(self.body), 64))
+
+class Fetcher:
+    def __init__(self, bodies):
+        self.bodies = bodies
+
+    def get(self, url, stream=False):
+        return Resp(200, self.bodies[url]) if url in self.bodies else Resp(404)
+
+def extractor(min_year=2019, max_year=2030):
+    missing = "https://school.example/gone.ics"
+    return FinalsExtractor(Fetcher({URL: FEED}), KEYS, min_year, max_year, lambda start: [URL, missing])
+
+def test_crawl_school_streams_every_feed():
+    store = extractor().crawl_school({"school": "Example U", "start": "https://school.example/"})
+    df = store.to_frame(guess_term)
+    assert list(df["school"]) == ["Example U"] * 2
+    assert list(df["finals_start"]) == ["2024-05-06", "2024-05-10"]
+
+def test_year_window_applies():
+    assert extractor(min_year=2025).finals_from_ics(URL) == []
+    assert extractor().finals_from_ics(URL)[1] == {"start": date(2024, 5, 10), "end": date(2024, 5, 14),
+                                                    "source_url": URL}
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+from finals_index import FinalsIndex
+from finals_weekly import weekly_school_counts
+import event_study
+
+FINALS = pd.DataFrame({
+    "school": ["A", "A", "A", "B", "B", "C"],
+    "finals_start": ["2024-05-06", "2024-05-08", "2024-12-09", "2024-05-06", None, "2024-12-16"],
+    "finals_end":   ["2024-05-10", "2024-05-14", "2024-12-13", "2024-05-10", "2024-05-10", "2024-12-20"],
+})
+
+def test_weekly_intensity_matches_the_sweep():
+    pd.testing.assert_frame_equal(FinalsIndex(FINALS).weekly_intensity(), weekly_school_counts(FINALS))
+
+def test_distinct_windows_per_school_subset():
+    index = FinalsIndex(FINALS)
+    start, end = index.distinct_windows()
+    assert len(start) == 4                      # A and B share 2024-05-06..10
+    start, _ = index.distinct_windows(["B", "C"])
+    assert list(start.astype("datetime64[D]").astype(str)) == ["2024-05-06", "2024-12-16"]
+
+def test_event_weeks_same_from_index_or_table():
+    index = FinalsIndex(FINALS)
+    for schools in (None, ["A"], ["C"]):
+        np.testing.assert_array_equal(event_study.event_weeks(index, schools),
+                                      event_study.event_weeks(FINALS, schools))
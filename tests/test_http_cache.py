@@ -0,0 +1,87 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from http_cache import CHUNK, CachedFetcher
+
+BODY = b"".join(b'<a href="/p%06d">page %d</a>\n' % (i, i) for i in range(20000))   # ~0.6 MB
+
+@pytest.fixture
+def page():
+    log = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            log.append(self.headers.get("If-None-Match"))
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(BODY)))
+            self.send_header("ETag", '"v1"')
+            self.end_headers()
+            try:
+                self.wfile.write(BODY)
+            except OSError:        # reader hung up after the part it wanted
+                pass
+
+        def log_message(self, fmt, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/calendar", log
+    server.shutdown()
+    server.server_close()
+
+def first_chunk(fetcher, url):
+    r = fetcher.get(url, stream=True)
+    chunks = r.iter_content()
+    head = next(chunks)
+    chunks.close()              # stop early, like a link scan that found what it needed
+    return r, head
+
+def test_stopped_stream_is_cached_and_revalidated(tmp_path, page):
+    url, log = page
+    fetcher = CachedFetcher(str(tmp_path), fresh_for=0)
+    _, head = first_chunk(fetcher, url)
+    meta = fetcher._load(url)
+    assert head == BODY[:CHUNK] and meta["truncated"] and meta["size"] == CHUNK and meta["sha256"] is None
+
+    r, again = first_chunk(fetcher, url)
+    assert r.from_cache and again == head and log == [None, '"v1"']
+
+def test_reading_past_the_prefix_resumes_and_completes_the_entry(tmp_path, page):
+    url, log = page
+    fetcher = CachedFetcher(str(tmp_path), fresh_for=3600)
+    first_chunk(fetcher, url)
+    r = fetcher.get(url, stream=True)
+    assert r.from_cache and b"".join(r.iter_content()) == BODY
+    assert log == [None, None]             # fresh prefix, then one full download for the rest
+    meta = fetcher._load(url)
+    assert not meta["truncated"] and meta["size"] == len(BODY) and meta["sha256"]
+    assert fetcher.get(url, stream=True).content == BODY and len(log) == 2
+
+def test_whole_body_requests_skip_a_cached_prefix(tmp_path, page):
+    url, log = page
+    fetcher = CachedFetcher(str(tmp_path), fresh_for=3600)
+    first_chunk(fetcher, url)
+    assert fetcher.get(url).content == BODY and log == [None, None]
+    assert fetcher.fetch_to_cache(url).sha256 == fetcher._load(url)["sha256"]
+
+def test_fetch_to_cache_reads_a_prefix_through(tmp_path, page):
+    url, log = page
+    fetcher = CachedFetcher(str(tmp_path), fresh_for=3600)
+    first_chunk(fetcher, url)
+    r = fetcher.fetch_to_cache(url)
+    assert r.sha256 and r.content == BODY
+
+def test_frontier_page_scan_cut_short_is_revalidated_next_run(tmp_path, page):
+    from frontier import Frontier
+    url, log = page
+    for run in range(2):
+        frontier = Frontier(CachedFetcher(str(tmp_path), fresh_for=0), "FinalsICS-Test")
+        links = frontier.page_links(url, stop=lambda u: u.endswith("/p000001"))
+        assert links[:2] == [url.rsplit("/", 1)[0] + "/p000000", url.rsplit("/", 1)[0] + "/p000001"]
+    assert log == [None, '"v1"']
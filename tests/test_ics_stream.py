@@ -0,0 +1,44 @@
+import re
+from datetime import date
+from ics_stream import stream_events
+from event_store import EventStore
+
+KEYS = re.compile(r"\b(final|finals|exam|examination)\b", re.I)
+URL = "https://school.example/cal.ics"
+FEED = """BEGIN:VCALENDAR
+BEGIN:VEVENT
+SUMMARY:Final Exams
+DTSTART;VALUE=DATE:20240510
+DTEND;VALUE=DATE:20240515
+END:VEVENT
+BEGIN:VEVENT
+SUMMARY:Spring Break
+DTSTART;VALUE=DATE:20240311
+DTEND;VALUE=DATE:20240316
+END:VEVENT
+BEGIN:VEVENT
+SUMMARY:Reading period
+DESCRIPTION:before the fin
+ al exams
+DTSTART:20240506T090000
+DURATION:P2D
+END:VEVENT
+END:VCALENDAR
+"""
+
+def test_stream_events_keeps_only_keyword_matches():
+    store = stream_events(FEED.splitlines(keepends=True), URL, KEYS, "Example U")
+    assert len(store) == 2 and store.rows["match"].all()
+    assert store.finals(2019, 2030).to_rows() == [
+        {"start": date(2024, 5, 6), "end": date(2024, 5, 7), "source_url": URL},
+        {"start": date(2024, 5, 10), "end": date(2024, 5, 14), "source_url": URL},
+    ]
+
+def test_stream_events_matches_from_events_finals():
+    events = [
+        {"title": "Final Exams", "description": "", "start": date(2024, 5, 10), "end": date(2024, 5, 14), "source_url": URL},
+        {"title": "Spring Break", "description": "", "start": date(2024, 3, 11), "end": date(2024, 3, 15), "source_url": URL},
+        {"title": "Reading period", "description": "before the final exams", "start": date(2024, 5, 6), "end": date(2024, 5, 7), "source_url": URL},
+    ]
+    streamed = stream_events(FEED.splitlines(keepends=True), URL, KEYS).finals(2019, 2030)
+    assert streamed.to_rows() == EventStore.from_events(events, KEYS).finals(2019, 2030).to_rows()
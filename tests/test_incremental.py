@@ -0,0 +1,95 @@
+import time
+from datetime import date
+import pandas as pd
+import incremental
+
+FEED = "https://school.example/cal.ics"
+
+class Resp:
+    def __init__(self, sha256: str):
+        self.status_code = 200
+        self.sha256 = sha256
+
+class Fetcher:
+    def __init__(self, sha256: str = "abc"):
+        self.sha256 = sha256
+
+    def fetch_to_cache(self, url):
+        return Resp(self.sha256)
+
+def old_entry(discovered_at: float, params: str = "p1"):
+    return {"start": "https://school.example/", "discovered_at": discovered_at, "ics": [FEED],
+            "feeds": {FEED: {"sha256": "abc", "params": params, "checked_at": discovered_at,
+                             "rows": [{"start": "2024-05-10", "end": "2024-05-14"}]}}}
+
+ITEM = {"school": "Example U", "start": "https://school.example/"}
+
+def extract(url, r):
+    return [{"start": date(2025, 5, 9), "end": date(2025, 5, 13)}]
+
+def test_failed_rediscovery_keeps_known_feeds():
+    stale = time.time() - incremental.REDISCOVER_AFTER - 1
+    old = old_entry(stale)
+    entry, changes = incremental.refresh_school(ITEM, old, lambda start: [], Fetcher(), extract, params="p1")
+    assert entry["ics"] == [FEED]
+    assert entry["discovered_at"] == stale
+    assert entry["feeds"][FEED]["rows"] == old["feeds"][FEED]["rows"]
+    assert changes == {}
+
+def test_discovery_error_keeps_known_feeds():
+    def boom(start):
+        raise OSError("503")
+    stale = time.time() - incremental.REDISCOVER_AFTER - 1
+    entry, changes = incremental.refresh_school(ITEM, old_entry(stale), boom, Fetcher(), extract, params="p1")
+    assert entry["ics"] == [FEED] and changes == {}
+
+def test_unchanged_feed_reparsed_when_params_change():
+    now = time.time()
+    entry, changes = incremental.refresh_school(ITEM, old_entry(now), lambda start: [FEED], Fetcher(), extract,
+                                                params="p2")
+    assert changes == {FEED: [{"start": "2025-05-09", "end": "2025-05-13"}]}
+    assert entry["feeds"][FEED]["params"] == "p2"
+
+    _, changes = incremental.refresh_school(ITEM, entry, lambda start: [FEED], Fetcher(), extract, params="p2")
+    assert changes == {}
+
+def test_extraction_params_follow_settings():
+    import re
+    keys = re.compile(r"\bfinal\b", re.I)
+    assert incremental.extraction_params(2019, 2025, keys) == incremental.extraction_params(2019, 2025, keys)
+    assert incremental.extraction_params(2019, 2025, keys) != incremental.extraction_params(2019, 2026, keys)
+    assert incremental.extraction_params(2019, 2025, keys) != \
+        incremental.extraction_params(2019, 2025, re.compile(r"\bexam\b", re.I))
+
+# ------------------- CSV PATCHING -------------------
+FEED_A, FEED_B = "https://school.example/a.ics", "https://school.example/b.ics"
+
+def run(tmp_path, feeds, schools=(ITEM,)):
+    """One incremental run; feeds maps url -> list of (start, end) dates."""
+    class Feeds:
+        def fetch_to_cache(self, url):
+            return Resp(repr(feeds[url]))
+    def extract_feed(url, r):
+        return [{"start": s, "end": e} for s, e in feeds[url]]
+    return incremental.incremental_update(
+        list(schools), str(tmp_path / "finals.csv"), str(tmp_path / "manifest.json"),
+        lambda start: list(feeds), Feeds(), extract_feed, lambda month: "Spring",
+        lambda items, fn: [fn(i) for i in items])
+
+def windows(df):
+    return sorted(zip(df["finals_start"], df["finals_end"]))
+
+def test_changed_feed_keeps_windows_other_feeds_still_list(tmp_path):
+    may24, dec24, may25 = (date(2024, 5, 10),) * 2, (date(2024, 12, 10),) * 2, (date(2025, 5, 10),) * 2
+    df = run(tmp_path, {FEED_A: [may24], FEED_B: [may24, dec24]})
+    assert windows(df) == [("2024-05-10", "2024-05-10"), ("2024-12-10", "2024-12-10")]
+    df = run(tmp_path, {FEED_A: [may25], FEED_B: [may24, dec24]})
+    assert windows(df) == [("2024-05-10", "2024-05-10"), ("2024-12-10", "2024-12-10"),
+                           ("2025-05-10", "2025-05-10")]
+
+def test_csv_rewritten_outside_incremental_is_regenerated(tmp_path):
+    may24 = (date(2024, 5, 10),) * 2
+    run(tmp_path, {FEED_A: [may24]})
+    pd.DataFrame(columns=incremental.FINALS_COLUMNS).to_csv(tmp_path / "finals.csv", index=False)
+    df = run(tmp_path, {FEED_A: [may24]})
+    assert list(df["school"]) == ["Example U"] and windows(df) == [("2024-05-10", "2024-05-10")]
@@ -0,0 +1,33 @@
+import os
+import pandas as pd
+import serve
+
+class Snap:
+    rows, loaded_at, values = 1, 0.0, {}
+
+def test_reload_swaps_snapshot_and_generation_together(tmp_path, monkeypatch):
+    paths = [str(tmp_path / n) for n in ("finals.csv", "trends.csv", "tidy.csv")]
+    for p in paths:
+        open(p, "w").close()
+    loaded = []
+    monkeypatch.setattr(serve, "load_snapshot", lambda *a: loaded.append(Snap()) or loaded[-1])
+    svc = serve.Service(*paths)
+    assert svc.current == (loaded[0], 0)
+    assert not svc.reload_if_changed()
+    os.utime(paths[2], (1, 1))
+    assert svc.reload_if_changed()
+    assert svc.current == (loaded[1], 1)
+    assert (svc.snapshot, svc.generation) == svc.current
+    assert svc.health()["generation"] == 1
+
+def test_far_dates_answer_instead_of_crashing():
+    finals = pd.DataFrame({"school": ["A"], "finals_start": ["2024-05-06"], "finals_end": ["2024-05-10"]})
+    trends = pd.DataFrame({"date": pd.to_datetime(["2024-05-01", "2024-06-01"]), "pizza_near_me": [50.0, 60.0]})
+    snap = serve.Snapshot(finals, trends, None)
+    assert snap.schools({"date": "99999-01-01"}) == {"date": "99999-01-01", "count": 0, "schools": []}
+    assert snap.schools({"date": "2024-05-08"})["schools"] == ["A"]
+    svc = serve.Service.__new__(serve.Service)
+    svc.current, svc.cache = (snap, 0), serve.LRUCache(4)
+    svc.routes = {"/schools": serve.Snapshot.schools}
+    assert svc.query("/schools", "date=99999-01-01")[0] == 200
+    assert svc.query("/schools", "date=2024-13-45")[0] == 400
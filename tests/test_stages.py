@@ -0,0 +1,22 @@
+import os
+import scrape_finals as sf
+
+def test_trends_csv_default_pull_keeps_snapshot_path():
+    assert sf.trends_csv() == sf.TRENDS_CSV
+
+def test_trends_csv_named_after_geo_and_keywords():
+    ny = sf.trends_csv("US-NY", ["pizza near me"])
+    assert os.path.basename(ny) == "trends_us_ny_pizza-near-me_2019_to_today.csv"
+    assert sf.trends_csv("US-MA", ["Coffee near me"]) != sf.TRENDS_CSV
+
+def test_merged_csv_used_only_when_newer_than_inputs(tmp_path, monkeypatch):
+    paths = {name: str(tmp_path / f"{name}.csv") for name in ("FINALS_CSV", "TRENDS_CSV", "MERGED_CSV")}
+    for name, p in paths.items():
+        monkeypatch.setattr(sf, name, p)
+    assert not sf.merged_is_current()
+    for i, p in enumerate(paths.values()):
+        open(p, "w").close()
+        os.utime(p, (i, i))
+    assert sf.merged_is_current()
+    os.utime(paths["TRENDS_CSV"], (9, 9))
+    assert not sf.merged_is_current()
@@ -0,0 +1,111 @@
+from datetime import date
+import numpy as np
+import pandas as pd
+import pytest
+from trends_fetch import TrendsFetcher
+
+START = date(2019, 1, 1)
+
+def truth(keyword: str, days: pd.DatetimeIndex) -> np.ndarray:
+    """Underlying daily interest: a per-keyword level, a yearly cycle and slow growth,
+    so later windows reach new maxima (and Google's 0-100 scale shifts)."""
+    level = 1 + sum(map(ord, keyword)) % 17
+    t = (days - pd.Timestamp(START)).days.to_numpy()
+    return level * (1.5 + np.sin(2 * np.pi * (t + level) / 365.25)) * (1 + t / 2000)
+
+class RateLimited(Exception):
+    class response:
+        status_code = 429
+
+class FakeTrends:
+    """pytrends stand-in: daily rows up to 269 days, Sunday weeks up to five years, months
+    beyond; every request is scaled so its largest value is 100, like Google does."""
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.calls = []
+
+    def build_payload(self, kw_list, timeframe, geo, cat, gprop):
+        assert len(kw_list) <= 5
+        self.kw_list, self.timeframe = list(kw_list), timeframe
+
+    def interest_over_time(self):
+        self.calls.append((self.kw_list, self.timeframe))
+        if self.errors:
+            raise self.errors.pop(0)
+        start, end = self.timeframe.split()
+        days = pd.date_range(start, end)
+        raw = pd.DataFrame({kw: truth(kw, days) for kw in self.kw_list}, index=days)
+        span = (days[-1] - days[0]).days
+        if span >= 5 * 365:
+            raw = raw.groupby(days.to_period("M").start_time).mean()
+        elif span >= 270:
+            raw = raw.groupby(days.to_period("W-SAT").start_time).mean()
+        df = raw * 100 / raw.max().max()
+        df["isPartial"] = False
+        return df
+
+def fetcher(tmp_path, client, sleeps=None):
+    return TrendsFetcher(str(tmp_path), client_factory=lambda: client, min_interval=0,
+                         sleep=(sleeps.append if sleeps is not None else lambda s: None))
+
+def scale(df: pd.DataFrame, other: pd.DataFrame) -> np.ndarray:
+    """Per-cell ratio df / other over their common dates and columns."""
+    m = df.merge(other, on="date", suffixes=("", "_o"))
+    cols = [c for c in df.columns if c != "date"]
+    return np.concatenate([(m[c] / m[c + "_o"]).to_numpy() for c in cols])
+
+def test_batches_share_the_anchor_scale(tmp_path):
+    keywords = ["pizza near me", "coffee near me", "sushi near me", "tacos near me",
+                "ramen near me", "bagels near me", "donuts near me"]
+    client = FakeTrends()
+    df = fetcher(tmp_path, client).fetch(keywords, "US-MA", START, date(2024, 6, 15))
+    assert [kw for kw, _ in client.calls] == [keywords[:5], [keywords[0]] + keywords[5:]]
+
+    # ground truth: one request over every keyword at once (no 5-term limit here)
+    full = FakeTrends()
+    full.kw_list, full.timeframe = keywords, f"{START} 2024-06-15"
+    ref = full.interest_over_time().drop(columns="isPartial")
+    ref.columns = [c.replace(" ", "_") for c in ref.columns]
+    ref = ref.rename_axis("date").reset_index()
+    ref["date"] = ref["date"].dt.date
+    np.testing.assert_allclose(scale(df, ref), scale(df, ref)[0], rtol=1e-9)
+
+def test_tail_refresh_matches_a_fresh_full_fetch(tmp_path):
+    keywords = ["pizza near me", "coffee near me"]
+    client = FakeTrends()
+    f = fetcher(tmp_path / "cache", client)
+    f.fetch(keywords, "US-MA", START, date(2024, 6, 15))         # June 2024 is partial
+    stitched = f.fetch(keywords, "US-MA", START, date(2024, 8, 20))
+    start, end = client.calls[-1][1].split()
+    assert len(client.calls) == 2 and start == "2024-03-01" and end == "2024-08-20"
+
+    fresh = fetcher(tmp_path / "fresh", FakeTrends()).fetch(keywords, "US-MA", START, date(2024, 8, 20))
+    assert list(stitched["date"]) == list(fresh["date"])
+    assert fresh["date"].iloc[-1] == date(2024, 8, 1)
+    # Trends pins each response's own maximum to 100, so a fresh fetch over the longer
+    # window sits on a different 0-100 scale; the stitched series must differ from it
+    # by that one constant factor only - including the once-partial June and the
+    # partial August.
+    ratios = scale(stitched, fresh)
+    np.testing.assert_allclose(ratios, ratios[0], rtol=1e-9)
+
+def test_rate_limit_backs_off_and_retries(tmp_path):
+    sleeps = []
+    client = FakeTrends(errors=[RateLimited(), RateLimited()])
+    df = fetcher(tmp_path, client, sleeps).fetch(["pizza near me"], "US-MA", START, date(2024, 6, 15))
+    assert len(client.calls) == 3 and not df.empty
+    assert len(sleeps) == 2 and 30 <= sleeps[0] <= 37.5 and 60 <= sleeps[1] <= 75
+
+def test_rate_limit_gives_up_after_max_retries(tmp_path):
+    client = FakeTrends(errors=[RateLimited()] * 3)
+    f = TrendsFetcher(str(tmp_path), client_factory=lambda: client, min_interval=0,
+                      max_retries=2, sleep=lambda s: None)
+    with pytest.raises(RateLimited):
+        f.fetch(["pizza near me"], "US-MA", START, date(2024, 6, 15))
+    assert len(client.calls) == 3
+
+def test_other_errors_are_not_retried(tmp_path):
+    client = FakeTrends(errors=[ValueError("bad geo")])
+    with pytest.raises(ValueError):
+        fetcher(tmp_path, client).fetch(["pizza near me"], "US-MA", START, date(2024, 6, 15))
+    assert len(client.calls) == 1
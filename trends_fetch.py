@@ -0,0 +1,199 @@
+import os, re, time, random
+from datetime import date
+from typing import Callable, Dict, List, Optional
+import pandas as pd
+
+# Batched, cached Google Trends fetch layer.
+#  - up to BATCH_SIZE keywords per request: the anchor term + 4 others, so every
+#    batch can be rescaled onto one common scale via the anchor's values
+#  - one cached series per (keyword, geo, window start) under .trends_cache/
+#  - refreshes only fetch the tail since the last snapshot (plus a few overlapping
+#    periods used to rescale the tail onto the cached values)
+#  - 429s back off exponentially with jitter
+# The client only needs pytrends' build_payload() / interest_over_time(), so a stub
+# object can stand in for TrendReq in tests.
+
+BATCH_SIZE   = 5            # Google Trends compares at most 5 terms per request
+OVERLAP      = 3            # cached periods re-fetched with each tail for rescaling
+MAX_TAIL     = 240          # days; longer gaps get a full re-fetch (tail stays daily-resolution)
+MIN_INTERVAL = 2.0          # seconds between requests
+MAX_RETRIES  = 5
+BACKOFF      = 30.0         # first 429 wait (seconds), doubled each retry
+
+def default_client():
+    from pytrends.request import TrendReq
+    return TrendReq(hl="en-US", tz=0)
+
+def slug(keyword: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", keyword.lower()).strip("_")
+
+def is_rate_limited(exc: Exception) -> bool:
+    resp = getattr(exc, "response", None)
+    return getattr(resp, "status_code", None) == 429 or type(exc).__name__ == "TooManyRequestsError"
+
+# ------------------- CACHE -------------------
+class TrendsCache:
+    """One CSV (date,value) per (keyword, geo, window start)."""
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def path(self, keyword: str, geo: str, start: date) -> str:
+        return os.path.join(self.cache_dir, f"{geo or 'world'}__{start.isoformat()}__{slug(keyword)}.csv")
+
+    def load(self, keyword: str, geo: str, start: date) -> Optional[pd.Series]:
+        p = self.path(keyword, geo, start)
+        if not os.path.exists(p):
+            return None
+        df = pd.read_csv(p, parse_dates=["date"])
+        return df.set_index("date")["value"] if not df.empty else None
+
+    def save(self, keyword: str, geo: str, start: date, s: pd.Series):
+        p = self.path(keyword, geo, start)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        s.rename("value").rename_axis("date").reset_index().to_csv(p + ".tmp", index=False)
+        os.replace(p + ".tmp", p)
+
+# ------------------- HELPERS -------------------
+def period_days(s: pd.Series) -> int:
+    """Sampling period of a cached series: 1 (daily), 7 (weekly) or 30 (monthly)."""
+    if len(s) < 2:
+        return 30
+    step = pd.Series(s.index).diff().dt.days.median()
+    return 1 if step < 4 else 7 if step < 20 else 30
+
+def to_grid(index: pd.DatetimeIndex, cached: pd.Series) -> pd.DatetimeIndex:
+    """Map dates onto the cached series' sampling grid (month / week / day starts)."""
+    p = period_days(cached)
+    if p == 30:
+        return index.to_period("M").to_timestamp()
+    if p == 7:
+        origin = cached.index[0]
+        return origin + pd.to_timedelta(((index - origin).days // 7) * 7, unit="D")
+    return index.normalize()
+
+def anchor_ratio(ref: pd.Series, new: pd.Series) -> float:
+    """Scale factor that puts `new` onto `ref`'s scale using their common dates."""
+    common = ref.index.intersection(new.index)
+    num, den = ref.loc[common].sum(), new.loc[common].sum()
+    return float(num / den) if len(common) and den > 0 and num > 0 else 1.0
+
+def expected_latest(cached: pd.Series, end: date) -> pd.Timestamp:
+    return to_grid(pd.DatetimeIndex([pd.Timestamp(end)]), cached)[0]
+
+# ------------------- FETCHER -------------------
+class TrendsFetcher:
+    def __init__(self, cache_dir: str, client_factory: Callable = default_client,
+                 min_interval: float = MIN_INTERVAL, max_retries: int = MAX_RETRIES,
+                 backoff: float = BACKOFF, sleep: Callable[[float], None] = time.sleep):
+        self.cache = TrendsCache(cache_dir)
+        self.client_factory = client_factory
+        self.client = None
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.sleep = sleep
+        self.requests = 0
+        self._last = 0.0
+
+    def _request(self, keywords: List[str], geo: str, start: date, end: date) -> pd.DataFrame:
+        """One interest_over_time call, paced and retried on 429."""
+        if self.client is None:
+            self.client = self.client_factory()
+        timeframe = f"{start.isoformat()} {end.isoformat()}"
+        for attempt in range(self.max_retries + 1):
+            wait = self._last + self.min_interval - time.monotonic()
+            if wait > 0:
+                self.sleep(wait)
+            try:
+                self.requests += 1
+                self.client.build_payload(keywords, timeframe=timeframe, geo=geo, cat=0, gprop="")
+                df = self.client.interest_over_time()
+                self._last = time.monotonic()
+                break
+            except Exception as e:
+                self._last = time.monotonic()
+                if not is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+                delay = self.backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+                print(f"  ! Trends rate-limited (429); backing off {delay:.0f}s")
+                self.sleep(delay)
+        if df is None or df.empty:
+            raise RuntimeError(f"Empty Trends for {keywords}. Try broader geo/shorter timeframe.")
+        if "isPartial" in df.columns:
+            df = df.drop(columns=["isPartial"])
+        df.index = pd.to_datetime(df.index)
+        return df.astype(float)
+
+    def _batches(self, keywords: List[str], anchor: str) -> List[List[str]]:
+        others = [k for k in keywords if k != anchor]
+        step = BATCH_SIZE - 1
+        return [[anchor] + others[i:i + step] for i in range(0, len(others), step)] or [[anchor]]
+
+    def _full(self, keywords: List[str], anchor: str, geo: str, start: date, end: date,
+              ref: Optional[pd.Series]) -> Dict[str, pd.Series]:
+        """Fetch whole-window series for `keywords`, all on the scale of `ref` (the anchor)."""
+        out = {}
+        for batch in self._batches(keywords, anchor):
+            df = self._request(batch, geo, start, end)
+            if ref is None:
+                ref = df[anchor]
+            k = anchor_ratio(ref, df[anchor])
+            for kw in batch:
+                out[kw] = df[kw] * k
+        return out
+
+    def _tail(self, keywords: List[str], anchor: str, geo: str, start: date, end: date,
+              cached: Dict[str, pd.Series]) -> Dict[str, pd.Series]:
+        """Fetch just the recent window, resample it to the cached grid and splice it on."""
+        ref = cached[anchor]
+        p = period_days(ref)
+        last = min(cached[k].index[-1] for k in keywords + [anchor])
+        tail_start = to_grid(pd.DatetimeIndex([last - pd.Timedelta(days=p * OVERLAP)]), ref)[0].date()
+        out = {}
+        for batch in self._batches(keywords, anchor):
+            df = self._request(batch, geo, max(tail_start, start), end)
+            df = df.groupby(to_grid(df.index, ref)).mean()
+            # the last cached period may have been partial: rescale on the ones before it
+            k = anchor_ratio(ref.loc[ref.index < last], df[anchor])
+            for kw in batch:
+                old = cached[kw]
+                keep_until = old.index[-1]
+                new = df[kw] * k
+                out[kw] = pd.concat([old.loc[old.index < keep_until], new.loc[new.index >= keep_until]])
+            ref = out[anchor]
+        return out
+
+    def fetch(self, keywords: List[str], geo: str, start: date, end: Optional[date] = None,
+              anchor: Optional[str] = None) -> pd.DataFrame:
+        """date + one column per keyword (spaces -> underscores), all on one common scale."""
+        end = end or date.today()
+        anchor = anchor or keywords[0]
+        wanted = list(dict.fromkeys([anchor] + list(keywords)))
+        cached = {kw: self.cache.load(kw, geo, start) for kw in wanted}
+
+        missing = [kw for kw in wanted if cached[kw] is None]
+        if missing:
+            # new keywords: whole window, rescaled onto the cached anchor if there is one
+            got = self._full(missing, anchor, geo, start, end, cached[anchor])
+            for kw in missing:
+                cached[kw] = got[kw]
+                self.cache.save(kw, geo, start, got[kw])
+
+        # a series is stale once a whole sampling period is missing at the end; the
+        # (partial) last period is replaced by the next tail fetch
+        latest = expected_latest(cached[anchor], end)
+        stale = [kw for kw in wanted if cached[kw].index[-1] < latest]
+        if stale:
+            last = min(cached[kw].index[-1] for kw in stale)
+            if (pd.Timestamp(end) - last).days > MAX_TAIL:
+                got = self._full(wanted, anchor, geo, start, end, None)   # rebuild the common scale
+            else:
+                got = self._tail([kw for kw in stale if kw != anchor], anchor, geo, start, end, cached)
+            for kw, series in got.items():
+                cached[kw] = series
+                self.cache.save(kw, geo, start, series)
+
+        df = pd.DataFrame({kw.replace(" ", "_"): cached[kw] for kw in keywords})
+        df = df.rename_axis("date").reset_index()
+        df["date"] = pd.to_datetime(df["date"]).dt.date
+        return df.sort_values("date").reset_index(drop=True)
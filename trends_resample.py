@@ -0,0 +1,113 @@
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+from finals_weekly import day_ordinals, week_ordinals, week_start_from_ordinal
+
+# Trends -> dense day / week spine. Whatever the sampling (daily, weekly, monthly),
+# every observation covers the days up to the next one (the last one its nominal
+# period), so the spine runs gap-free from the first to the last covered day:
+#   "step"   each day takes the value of the period it falls in (a month's days
+#            average back to the monthly index)
+#   "linear" straight lines between period midpoints
+# Weeks are Monday-based ordinals (finals_weekly); a week's value is the mean of its
+# spine days. All of it is searchsorted / reduceat over day ordinals, no per-row work.
+
+# ------------------- SETTINGS -------------------
+METHOD = "step"
+
+def value_columns(trends_df: pd.DataFrame) -> List[str]:
+    return [c for c in trends_df.columns if c not in ("date", "week_start")]
+
+def coverage(days: np.ndarray) -> np.ndarray:
+    """Exclusive end day of each (sorted, unique) observation."""
+    if len(days) == 0:
+        return days.copy()
+    step = np.median(np.diff(days)) if len(days) > 1 else 30
+    if step < 4:
+        last = days[-1] + 1
+    elif step < 20:
+        last = days[-1] + 7
+    else:
+        last = (days[-1:].astype("datetime64[D]").astype("datetime64[M]") + 1).astype("datetime64[D]").astype(np.int64)[0]
+    return np.append(days[1:], last)
+
+def _observations(trends_df: pd.DataFrame, value_cols: List[str]):
+    """(sorted unique day ordinals, float values); duplicate dates are averaged."""
+    days = day_ordinals(trends_df["date"])
+    vals = trends_df[value_cols].to_numpy(dtype="float64")
+    ok = days != np.datetime64("NaT").astype(np.int64)
+    days, vals = days[ok], vals[ok]
+    uniq, inv = np.unique(days, return_inverse=True)
+    if len(uniq) != len(days):
+        vals = _group_mean(vals, inv, len(uniq))
+    return uniq, vals
+
+def _group_mean(vals: np.ndarray, groups: np.ndarray, n: int) -> np.ndarray:
+    """NaN-skipping mean of rows per group id (0..n-1)."""
+    present = ~np.isnan(vals)
+    sums = np.zeros((n, vals.shape[1]))
+    counts = np.zeros((n, vals.shape[1]))
+    np.add.at(sums, groups, np.where(present, vals, 0.0))
+    np.add.at(counts, groups, present)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+def daily_spine(trends_df: pd.DataFrame, method: str = METHOD,
+                value_cols: Optional[List[str]] = None):
+    """(day ordinals, values) for every day from the first observation to the last covered day."""
+    value_cols = value_cols or value_columns(trends_df)
+    obs, vals = _observations(trends_df, value_cols)
+    if len(obs) == 0:
+        return obs, vals
+    end = coverage(obs)
+    spine = np.arange(obs[0], end[-1], dtype=np.int64)
+    if method == "step":
+        return spine, vals[np.searchsorted(obs, spine, side="right") - 1]
+    if method != "linear":
+        raise ValueError(f"unknown method {method!r} (step / linear)")
+    mid = (obs + end - 1) / 2
+    out = np.empty((len(spine), len(value_cols)))
+    for j in range(len(value_cols)):
+        ok = ~np.isnan(vals[:, j])
+        out[:, j] = np.interp(spine, mid[ok], vals[ok, j]) if ok.any() else np.nan
+    return spine, out
+
+def align_trends_to_day(trends_df: pd.DataFrame, method: str = METHOD) -> pd.DataFrame:
+    """Dense daily table: date + value columns."""
+    value_cols = value_columns(trends_df)
+    spine, vals = daily_spine(trends_df, method, value_cols)
+    df = pd.DataFrame(vals, columns=value_cols)
+    df.insert(0, "date", spine.astype("datetime64[D]").astype("datetime64[ns]"))
+    return df
+
+def align_trends_to_week(trends_df: pd.DataFrame, method: str = METHOD) -> pd.DataFrame:
+    """Dense weekly table: week_start (Monday, date objects) + mean of each week's spine days."""
+    value_cols = value_columns(trends_df)
+    spine, vals = daily_spine(trends_df, method, value_cols)
+    if len(spine) == 0:
+        return pd.DataFrame(columns=["week_start"] + value_cols)
+    weeks = week_ordinals(spine)
+    first = np.flatnonzero(np.r_[True, weeks[1:] != weeks[:-1]])
+    present = ~np.isnan(vals)
+    sums = np.add.reduceat(np.where(present, vals, 0.0), first, axis=0)
+    counts = np.add.reduceat(present.astype(np.int64), first, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    df = pd.DataFrame(means, columns=value_cols)
+    df.insert(0, "week_start", week_start_from_ordinal(weeks[first]).date)
+    return df
+
+def join_weekly(trends_weekly: pd.DataFrame, finals_weekly: pd.DataFrame,
+                cols: List[str]) -> pd.DataFrame:
+    """finals_weekly[cols] reindexed onto the trends weeks by week ordinal; missing weeks -> 0."""
+    spine = week_ordinals(day_ordinals(trends_weekly["week_start"]))
+    present = [c for c in cols if c in finals_weekly.columns]
+    if len(finals_weekly):
+        right = finals_weekly[present].set_index(week_ordinals(day_ordinals(finals_weekly["week_start"])))
+        right = right[~right.index.duplicated()].reindex(spine, fill_value=0)
+    else:
+        right = pd.DataFrame(0, index=spine, columns=present)
+    out = trends_weekly.reset_index(drop=True)
+    for c in cols:
+        out[c] = right[c].fillna(0).astype(int).to_numpy() if c in right.columns else 0
+    return out